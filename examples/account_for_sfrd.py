@@ -1,7 +1,4 @@
 import time
-import multiprocessing as mp
-from os import listdir
-from os.path import isfile, join
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -14,34 +11,24 @@ n_stars = 1000
 
 data_dir = 'data/newdata'
 
-files = [f for f in listdir(data_dir) if isfile(join(data_dir, f))]
-
-def execute(file):
+# The files are loaded by spawned worker processes, which import this
+# script, so the work must only happen when it is run directly.
+if __name__ == "__main__":
     start = time.time()
-    universe = takahe.universe.create('real')
-
-    universe.populate(f"{data_dir}/{file}", n_stars=n_stars)
-
-    z = universe.get_metallicity()
 
-    size = universe.populace.size()
+    # Loads every metallicity concurrently, one process per CPU.
+    populations = takahe.load.from_directory(data_dir, n_stars=n_stars)
 
-#    universe.set_nbins(51)
-#    universe.event_rate(pickle_results=True)
-
-    end = time.time()
-    print(f"Completed z={z} in {end-start} seconds. {n_stars} requested, {size} generated.")
+    for z, populace in populations.items():
+        universe = takahe.universe.create('real')
+        universe.populace = populace
 
-    return 1
+        size = universe.populace.size()
 
-cpus_to_use = min(3*mp.cpu_count(), len(files))
+#        universe.set_nbins(51)
+#        universe.event_rate(pickle_results=True)
 
-print(f"Running on {cpus_to_use} CPUs")
+        print(f"Loaded z={z}. {n_stars} requested, {size} generated.")
 
-pool = mp.Pool(cpus_to_use)
-
-results = [pool.apply_async(execute, args=(file,)) for file in files]
-
-results = [r.get() for r in results]
-
-pool.close()
+    end = time.time()
+    print(f"Completed in {end-start} seconds.")
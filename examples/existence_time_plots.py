@@ -13,7 +13,9 @@ universe.populate('data/newdata/Remnant-Birth-bin-imf135_300-z020_StandardJJ.dat
 
 plt.subplot(212)
 cts = universe.populace.get_cts()
-plt.hist(cts, bins=[x for x in range(0, int(13.8e9), int(3e7))])
+# Each entry stands for multiplicity systems, so weight it accordingly.
+plt.hist(cts, bins=[x for x in range(0, int(13.8e9), int(3e7))],
+         weights=universe.populace.column('multiplicity'))
 plt.xlabel("Coalescence Time")
 plt.ylabel("Frequency")
 
@@ -9,6 +9,9 @@ Auckland, and is in constant, rolling development.
 """
 
 import takahe.binary_star_system as BSS
+import takahe.cache
 import takahe.ensemble
+import takahe.kernels
 import takahe.loader as load
+import takahe.peters
 import takahe.universe
@@ -1,9 +1,9 @@
 import numpy as np
-import matplotlib.pyplot as plt
 
 import takahe.helpers
+import takahe.kernels
+import takahe.peters
 from takahe.constants import *
-from mpl_toolkits.mplot3d import Axes3D
 
 def create(primary_mass, secondary_mass, a0, e0, extra_terms=dict()):
     """Creates a given Binary Star System from provided data.
@@ -39,6 +39,106 @@ def create(primary_mass, secondary_mass, a0, e0, extra_terms=dict()):
                             e0,
                             extra_terms)
 
+def resolve_event(event, m1, m2):
+    """Translates an event specification into an event function.
+
+    Events terminate integration when they happen (see
+    takahe.helpers.integrate). The built-in events are
+
+        "isco": the SMA reaches the innermost stable circular orbit
+                of the total mass, 6GM/c^2
+        ("separation", a): the SMA reaches a (in solar radii)
+        ("gw_frequency", f): the GW frequency (twice the orbital
+                             frequency) reaches f (in Hz)
+        ("eccentricity", e): the eccentricity falls to e
+
+    Any other event is given as a 2-tuple of a numba-compiled function
+    event(t, y, params), which happens when it falls to zero, and its
+    params. The state y is [a (in m), e] and t is in seconds.
+
+    Events are located in time, so those which would happen within the
+    floating point precision of the coalescence time cannot be found.
+    This is the case for the ISCO unless a0 is within ~1000 ISCO radii.
+
+    Arguments:
+        event {str/tuple} -- The event specification.
+        m1 {float/ndarray} -- The primary mass(es) (in kg)
+        m2 {float/ndarray} -- The secondary mass(es) (in kg)
+
+    Returns:
+        mixed -- A 2-tuple of the event function and its parameters,
+                 as a 2D array with one row per mass.
+
+    Raises:
+        ValueError -- if the event is not recognised.
+    """
+    M = np.atleast_1d(np.asarray(m1 + m2, dtype=np.float64))
+
+    if event == 'isco':
+        function, values = takahe.helpers.separation_event, 6 * G * M / c**2
+    elif not isinstance(event, tuple) or len(event) != 2:
+        raise ValueError("Unrecognised event!")
+    elif event[0] == 'separation':
+        function = takahe.helpers.separation_event
+        values = np.full(len(M), event[1] * Solar_Radii * 1000)
+    elif event[0] == 'gw_frequency':
+        function = takahe.helpers.separation_event
+        values = np.cbrt(G * M / (np.pi * event[1])**2)
+    elif event[0] == 'eccentricity':
+        function = takahe.helpers.eccentricity_event
+        values = np.full(len(M), event[1], dtype=np.float64)
+    elif isinstance(event[0], str):
+        raise ValueError("Unrecognised event!")
+    else:
+        function = event[0]
+        params = np.atleast_1d(np.asarray(event[1], dtype=np.float64))
+
+        return function, np.ascontiguousarray(
+            np.broadcast_to(params, (len(M), len(params))))
+
+    return function, values[:, None]
+
+def _plot_track(t, a, e, m1, m2, ax=None):
+    """Plots the evolution of a BSS in phase space.
+
+    Arguments:
+        t {ndarray} -- The time array (in gigayears)
+        a {ndarray} -- The SMA array (in solar radii)
+        e {ndarray} -- The eccentricity array
+        m1 {float} -- The mass of the primary (in kg)
+        m2 {float} -- The mass of the secondary (in kg)
+
+    Keyword Arguments:
+        ax {matplotlib.axes3D} -- An axis object to plot on. Set to
+                                  None to generate a new one.
+                                  (default: {None})
+
+    Returns:
+        {matplotlib.axes3D} -- The axis object plotted on.
+    """
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d import Axes3D
+
+    if ax == None:
+        fig = plt.figure()
+        ax = fig.add_subplot(111, projection='3d')
+
+    a = a * (Solar_Radii * 1000)
+
+    k = G*(m1 + m2) / (4*np.pi**2)
+
+    T = np.sqrt(a**3 / k)
+
+    T /= 31557600000000000
+    T *= 1e9
+
+    ax.plot(t, T, e)
+    ax.set_xlabel('age (Gyr)')
+    ax.set_ylabel("period (yr)")
+    ax.set_zlabel("eccentricity")
+
+    return ax
+
 class BinaryStarSystem:
     """Represents a binary star system."""
 
@@ -94,7 +194,7 @@ class BinaryStarSystem:
             'coalescence_time': self.extra_terms['coalescence_time']
         }
 
-    def track_evolution(self, ax=None):
+    def track_evolution(self, ax=None, method='fixed'):
         """Tracks the evolution of a BSS in phase space.
 
         Propagates the BSS in time, generating the SMA and eccentricity
@@ -105,35 +205,15 @@ class BinaryStarSystem:
             ax {matplotlib.axes3D} -- An axis object to plot on. Set to
                                       None to allow takahe to generate
                                       its own. (default: {None})
+            method {str} -- The evolution method, see
+                            BSS.evolve_until. (default: {"fixed"})
 
         Returns:
             {matplotlib.axes3D} -- The axis object generated.
         """
-        ct = self.get('coalescence_time')
-
-        if ax == None:
-            fig = plt.figure()
-            ax = fig.add_subplot(111, projection='3d')
-
-        t, a, e = self.evolve_until_merger()
-
-        m1 = self.get('m1')
-        m2 = self.get('m2')
-        a *= (Solar_Radii * 1000)
-
-        k = G*(m1 + m2) / (4*np.pi**2)
+        t, a, e = self.evolve_until_merger(method=method)
 
-        T = np.sqrt(a**3 / k)
-
-        T /= 31557600000000000
-        T *= 1e9
-
-        ax.plot(t, T, e)
-        ax.set_xlabel('age (Gyr)')
-        ax.set_ylabel("period (yr)")
-        ax.set_zlabel("eccentricity")
-
-        return ax
+        return _plot_track(t, a, e, self.get('m1'), self.get('m2'), ax)
 
     def get(self, parameter):
         """Retrieve a given parameter.
@@ -178,54 +258,81 @@ class BinaryStarSystem:
         early_lifetime /= (1e9)
         return early_lifetime + self.get('coalescence_time')
 
-    def coalescence_time(self):
+    def coalescence_time(self, mode='approx'):
         """Computes the coalescence time for the BSS in gigayears.
 
-        Uses Eqn 10 from Nyadzani and Razzaque [1] to compute the
-        coalescence time for the binary star system. Although this is
-        strictly speaking an approximation, it converges on the
-        result gained by numerically by Peters in 1964.
+        By default, uses Eqn 10 from Nyadzani and Razzaque [1] to
+        compute the coalescence time for the binary star system.
+        Although this is strictly speaking an approximation, it
+        converges on the result gained by numerically by Peters in 1964.
+        The exact Peters result is available through mode='exact' (see
+        takahe.peters.coalescence_time).
 
         [1] https://arxiv.org/pdf/1905.06086.pdf
 
+        Keyword Arguments:
+            mode {str} -- "approx" or "exact". (default: {"approx"})
+
         Returns:
             float -- the coalescence time for the binary star (units: ga).
         """
+        return takahe.peters.coalescence_time(self.a0,
+                                              self.e0,
+                                              self.beta,
+                                              mode)
 
-        circ = self.a0**4 / (4*self.beta)
-        divisor = ((1-self.e0**(7/4))**(1/5)*(1+121/304 * self.e0**2))
-
-        return (circ * (1-self.e0**2)**(7/2) / divisor) / 31557600000000000
-
-    def circularises(self, thresholds=(0.0, 2*Solar_Radii)):
+    def circularises(self, thresholds=(0.0, 2*Solar_Radii),
+                     method='analytic'):
         """Determines if the orbit in question circularises or not.
 
         By default, this function assumes a BSS circularises if it's
-        eccentricity becomes arbitrarily close to 0 and it's final SMA
+        eccentricity becomes arbitrarily close to 0 while it's SMA
         is more than 2 solar radii (such that it does not merge).
 
+        The analytic method uses the Peters a(e) relation (see
+        takahe.peters.circularises). Any other method evolves the BSS
+        until merger with BSS.evolve_until, and inspects the track.
+
         Keyword Arguments:
             thresholds {tuple} -- The thresholds to determine if the
                                   system merges. The first entry in the
                                   tuple is the threshold for the
                                   eccentricity, the second is the
-                                  threshold for the SMA.
+                                  threshold for the SMA (in km).
                                   Default: (0, 2*Solar_Radii)
+            method {str} -- "analytic", or an evolution method of
+                            BSS.evolve_until. (default: {"analytic"})
 
         Returns:
             bool -- True if the orbit circularises, False otherwise.
         """
-        t, a, e = self.evolve_until_merger()
+        # As with np.isclose, count e within 1e-8 of the threshold.
+        e_threshold = thresholds[0] + 1e-8
+
+        if method == 'analytic':
+            return bool(takahe.peters.circularises(self.a0,
+                                                   self.e0,
+                                                   e_threshold,
+                                                   thresholds[1] * 1000))
+
+        t, a, e = self.evolve_until_merger(method=method)
+
+        # The first point at which either threshold is crossed.
+        crossed = (e <= e_threshold) | (a * Solar_Radii <= thresholds[1])
+
+        if not np.any(crossed):
+            return False
 
-        if np.isclose(e[-1], 0.0) and a[-1] > 2*Solar_Radii:
-            return True
+        first = np.argmax(crossed)
 
-        return False
+        return bool(e[first] <= e_threshold
+                    and a[first] * Solar_Radii > thresholds[1])
 
-    def evolve_until_merger(self):
+    def evolve_until_merger(self, **kwargs):
         """Syntactic sugar for BSS.evolve_until(BSS.coalescence_time())
 
-        Evolves a BSS in time until its coalescence time.
+        Evolves a BSS in time until its coalescence time. Any keyword
+        arguments are passed to BSS.evolve_until.
 
         Returns:
             mixed -- A 3-tuple containing the resultant time
@@ -233,40 +340,172 @@ class BinaryStarSystem:
                      solar radii) and eccentricity arrays.
         """
         t_span = (0, self.get('coalescence_time') * 1e9 * 60 * 60 * 24 * 365.25)
-        return self.evolve_until(t_span)
+        return self.evolve_until(t_span, **kwargs)
 
-    def evolve_until(self, t_span):
+    def evolve_until_event(self, event, **kwargs):
+        """Evolves a BSS in time until an event happens.
+
+        Integrates with the adaptive integrator, up to the exact
+        coalescence time of the BSS, and stops at the event (see
+        resolve_event for the available events). Any other keyword
+        arguments are passed to BSS.evolve_until.
+
+        Arguments:
+            event {str/tuple} -- The event to stop at.
+
+        Returns:
+            mixed -- A 4-tuple containing the resultant time
+                     array (in gigayears), the resultant SMA (in
+                     solar radii) and eccentricity arrays, and the
+                     time, SMA and eccentricity at the event (NaN if
+                     the BSS merged before it).
+        """
+        kwargs.setdefault('method', 'adaptive')
+
+        tau = self.coalescence_time(mode='exact') * 31557600000000000
+        return self.evolve_until((0, tau), event=event, **kwargs)
+
+    def evolve_until(self, t_span, method='fixed', rtol=1e-8, atol=1e-10,
+                     t_eval=None, event=None, kernel='peters',
+                     kernel_params=()):
         """Evolve the binary star system in time.
 
         Uses a Runge-Kutta algorithm to evolve the binary star system
         over a specified range evolve_over.
 
         This function adopts the Peters prescription, with customisable
-        terms for da/dt and de/dt. This function is compiled using
-        numba to achieve performance gains
+        terms for da/dt and de/dt given by the RHS kernel (see
+        takahe.kernels). This function is compiled using numba to
+        achieve performance gains
+
+        Two integrators are available. The fixed integrator takes 10000
+        evenly spaced RKF45 steps. The adaptive integrator instead
+        chooses its steps from the embedded RKF45 error estimate, which
+        takes large steps early on and small ones near merger.
+
+        The emulator does not integrate at all, and instead evaluates
+        the self-similar solution of the Peters equations (see
+        takahe.peters.emulate). It is much faster, and agrees with the
+        integrators to ~1e-7 except in the last ~1e-6 of the time to
+        merger, but ignores any extra terms in da/dt and de/dt.
+
+        Both integrators can also stop at an event, e.g. when the SMA
+        reaches the ISCO (see resolve_event). The event is located by
+        root-finding within the step it happens in, and is returned in
+        addition to the solution.
 
         Arguments:
             t_span {tuple} -- A 2-tuple that corresponds to the start
-                              and end points of integration.
+                              and end points of integration
+                              (in seconds).
+
+        Keyword Arguments:
+            method {str} -- "fixed", "adaptive" or "emulator".
+                            (default: {"fixed"})
+            rtol {float} -- The relative tolerance of the adaptive
+                            integrator. (default: {1e-8})
+            atol {float} -- The absolute tolerance of the adaptive
+                            integrator, relative to a0 for the SMA.
+                            (default: {1e-10})
+            t_eval {array} -- The times (in seconds) to return the
+                              solution of the adaptive integrator or
+                              the emulator at. Set to None to return it
+                              at every step (adaptive) or at 10000
+                              evenly spaced times (emulator).
+                              (default: {None})
+            event {str/tuple} -- The event to stop at, see
+                                 resolve_event. Set to None to not stop
+                                 early. (default: {None})
+            kernel {str/function} -- The RHS kernel, or the name it is
+                                     registered under in takahe.kernels.
+                                     (default: {"peters"})
+            kernel_params {array} -- The parameters of the RHS kernel.
+                                     (default: {()})
 
         Returns:
             mixed -- A 3-tuple containing the resultant time
                      array (in gigayears), and the resultant SMA (in
-                     solar radii) and eccentricity arrays.
+                     solar radii) and eccentricity arrays. If an event
+                     is given, a 4-tuple which also contains the time,
+                     SMA and eccentricity at the event (NaN if it did
+                     not happen).
+
+        Raises:
+            ValueError -- if method is not "fixed", "adaptive" or
+                          "emulator", or if an event or a kernel other
+                          than "peters" is given with the emulator.
         """
+        rhs = takahe.kernels.get_kernel(kernel)
+        rhs_params = np.atleast_1d(np.asarray(kernel_params,
+                                              dtype=np.float64))
+
+        if method == 'emulator' and rhs is not takahe.helpers.peters_rhs:
+            raise ValueError("The emulator only supports the Peters kernel!")
+
+        if event is None:
+            event_function = takahe.helpers.no_event
+            event_params = np.empty(0)
+        elif method == 'emulator':
+            raise ValueError("Events require the fixed or adaptive method!")
+        else:
+            event_function, event_params = resolve_event(event,
+                                                         self.m1,
+                                                         self.m2)
+            event_params = event_params[0]
 
         t0 = np.float64(t_span[0])
         t1 = np.float64(t_span[1])
 
-        evolve_over = np.linspace(t0, t1, 10000)
-
-        a, e = takahe.helpers.integrate(evolve_over,
-                                        self.a0,
-                                        self.e0,
-                                        self.beta)
+        if method == 'fixed':
+            evolve_over = np.linspace(t0, t1, 10000)
+
+            a, e, event_state = takahe.helpers.integrate(evolve_over,
+                                                         self.a0,
+                                                         self.e0,
+                                                         self.beta,
+                                                         rhs, rhs_params,
+                                                         event_function,
+                                                         event_params)
+
+            evolve_over = evolve_over[:len(a)]
+        elif method == 'adaptive':
+            if t_eval is None:
+                t_eval = np.empty(0)
+
+            evolve_over, a, e, event_state = \
+                takahe.helpers.integrate_adaptive(
+                    t0, t1,
+                    self.a0, self.e0, self.beta,
+                    rtol, np.array([atol * self.a0, atol]),
+                    np.asarray(t_eval, dtype=np.float64),
+                    rhs, rhs_params,
+                    event_function, event_params)
+        elif method == 'emulator':
+            if t_eval is None:
+                t_eval = np.linspace(t0, t1, 10000)
+
+            evolve_over = np.array(t_eval, dtype=np.float64, ndmin=1)
+
+            a, e = takahe.peters.emulate(self.a0,
+                                         self.e0,
+                                         self.beta,
+                                         evolve_over - t0)
+
+            # Like the integrators, stop at merger.
+            alive = ~np.isnan(a)
+            evolve_over, a, e = evolve_over[alive], a[alive], e[alive]
+        else:
+            raise ValueError("method must be fixed, adaptive or emulator")
 
         # Convert quantities back into Solar Units
         evolve_over /= 31557600000000000
         a /= (Solar_Radii * 1000)
 
-        return evolve_over, a, e
+        if event is None:
+            return evolve_over, a, e
+
+        event_state = (event_state[0] / 31557600000000000,
+                       event_state[1] / (Solar_Radii * 1000),
+                       event_state[2])
+
+        return evolve_over, a, e, event_state
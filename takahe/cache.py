@@ -0,0 +1,268 @@
+"""
+On-disk caching of data which is expensive to generate.
+
+Everything takahe caches lives under a single directory, cache_dir(),
+so that it can be relocated or cleared in one place.
+
+Results (such as delay-time distributions and event rates) are cached
+by content: they are stored under a hash of everything they depend on
+(see key()), so a result is reused whenever the same inputs come round
+again, and never when any of them change. The result cache may be
+moved or limited in size with configure(). When it grows beyond its
+size limit, the least recently used results are evicted, and likewise
+for the binary copies of tables (see takahe.load.read_table).
+
+Disabling the cache with configure() stops takahe from reading or
+writing anything in it: results, tables and the Peters table (see
+takahe.peters) are then always computed afresh.
+"""
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+_settings = {'enabled': True, 'directory': None, 'max_size': 2**29,
+             'max_table_size': 2**32}
+
+def cache_dir():
+    """Locates the directory takahe caches generated data in.
+
+    This is the directory named by the TAKAHE_CACHE_DIR environment
+    variable if it is set, and ~/.cache/takahe otherwise.
+
+    Returns:
+        {str} -- The path to the cache directory.
+    """
+    default = os.path.join(os.path.expanduser("~"), ".cache", "takahe")
+    return os.environ.get("TAKAHE_CACHE_DIR", default)
+
+def configure(enabled=None, directory=None, max_size=None,
+              max_table_size=None):
+    """Configures the cache.
+
+    Settings which are not given are left as they are.
+
+    Keyword Arguments:
+        enabled {bool} -- Whether to read and write anything in the
+                          cache. (default: {None})
+        directory {str} -- The directory to keep results in. Results
+                           are kept in the results directory of
+                           cache_dir() until this is set.
+                           (default: {None})
+        max_size {int} -- The maximum total size of the cached results
+                          (in bytes). (default: {None})
+        max_table_size {int} -- The maximum total size of the binary
+                                copies of tables (in bytes).
+                                (default: {None})
+
+    Raises:
+        ValueError -- If a maximum size is negative.
+    """
+    for size in (max_size, max_table_size):
+        if size is not None and size < 0:
+            raise ValueError("Maximum sizes must be non-negative!")
+
+    for name, value in [('enabled', enabled),
+                        ('directory', directory),
+                        ('max_size', max_size),
+                        ('max_table_size', max_table_size)]:
+        if value is not None:
+            _settings[name] = value
+
+def enabled():
+    """Whether the cache is enabled (see configure()).
+
+    Returns:
+        {bool} -- True if the cache may be read and written.
+    """
+    return _settings['enabled']
+
+def table_dir():
+    """Locates the directory binary copies of tables are kept in.
+
+    Returns:
+        {str} -- The path to the table directory.
+    """
+    return os.path.join(cache_dir(), "tables")
+
+def result_dir():
+    """Locates the directory results are cached in.
+
+    Returns:
+        {str} -- The path to the result cache directory.
+    """
+    if _settings['directory'] is not None:
+        return _settings['directory']
+
+    return os.path.join(cache_dir(), "results")
+
+def _update(digest, part):
+    """Feeds a part of a key into a hash, tagged by its type."""
+    if isinstance(part, np.ndarray):
+        part = np.ascontiguousarray(part)
+        digest.update(f"ndarray{part.dtype.str}{part.shape}".encode())
+        digest.update(part.tobytes())
+    elif isinstance(part, (tuple, list)):
+        digest.update(f"{type(part).__name__}{len(part)}".encode())
+        for item in part:
+            _update(digest, item)
+    elif isinstance(part, dict):
+        _update(digest, sorted(part.items()))
+    elif isinstance(part, (str, bytes, bool, int, float, type(None),
+                           np.generic)):
+        digest.update(f"{type(part).__name__}{part!r}".encode())
+    else:
+        raise TypeError(f"Cannot hash a {type(part).__name__} into a key!")
+
+def key(*parts):
+    """Computes the key of a result from everything it depends on.
+
+    Arguments:
+        parts -- Strings, numbers, arrays, and tuples, lists or dicts
+                 of these.
+
+    Returns:
+        {str} -- The (hexadecimal SHA-256) key.
+
+    Raises:
+        TypeError -- If a part cannot be hashed.
+    """
+    digest = hashlib.sha256()
+    _update(digest, parts)
+
+    return digest.hexdigest()
+
+def _path(key):
+    return os.path.join(result_dir(), f"{key}.pickle")
+
+def load(key):
+    """Fetches a cached result.
+
+    Arguments:
+        key {str} -- The key of the result (see key()).
+
+    Returns:
+        The result, or None if it is not cached or the cache is
+        disabled.
+    """
+    if not _settings['enabled']:
+        return None
+
+    path = _path(key)
+
+    try:
+        with open(path, 'rb') as f:
+            result = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+    mark_used(path)
+
+    return result
+
+def save(key, result):
+    """Caches a result, then evicts old results if over the size limit.
+
+    Failure to write the result is not an error, and nothing is written
+    if the cache is disabled.
+
+    Arguments:
+        key {str} -- The key of the result (see key()).
+        result -- The (picklable) result.
+    """
+    if not _settings['enabled']:
+        return
+
+    path = _path(key)
+
+    try:
+        os.makedirs(result_dir(), exist_ok=True)
+
+        # Write atomically, in case another process reads it.
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError:
+        return
+
+    evict(result_dir(), _settings['max_size'])
+
+def cached(key, compute):
+    """Fetches a cached result, computing and caching it if needed.
+
+    Arguments:
+        key {str} -- The key of the result (see key()).
+        compute {callable} -- Computes the result.
+
+    Returns:
+        The result.
+    """
+    result = load(key)
+
+    if result is None:
+        result = compute()
+        save(key, result)
+
+    return result
+
+def mark_used(path):
+    """Marks a cached file as recently used, so it is evicted last.
+
+    Arguments:
+        path {str} -- The path to the file.
+    """
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def evict(directory, max_size, suffix=".pickle"):
+    """Deletes the least recently used files until under max_size.
+
+    Arguments:
+        directory {str} -- The directory to evict files from.
+        max_size {int} -- The maximum total size of the files (in
+                          bytes).
+
+    Keyword Arguments:
+        suffix {str} -- Only files ending in suffix are considered.
+                        (default: {".pickle"})
+    """
+    entries = []
+
+    try:
+        it = os.scandir(directory)
+    except OSError:
+        return
+
+    with it:
+        for entry in it:
+            if entry.name.endswith(suffix):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+
+        total -= size
+
+def evict_tables():
+    """Evicts the least recently used tables, if over their size limit."""
+    evict(table_dir(), _settings['max_table_size'], ".npy")
+
+def clear():
+    """Deletes every cached result."""
+    evict(result_dir(), 0)
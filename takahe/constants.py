@@ -1,7 +1,11 @@
 """
 Some simple constant definitions to enable better structure of code.
 """
+import numpy as np
 from scipy.constants import c, G
 
 Solar_Mass = 1.989e30 # Kilograms
 Solar_Radii = 695500 # Kilometers
+
+# Edges of the BPASS time bins, centred on log(age/yr) = 6.0, 6.1, ..., 11.0
+BPASS_TIME_EDGES = np.append([0.0], 10**np.arange(6.05, 11.15, 0.1)) / 1e9 # Gyr
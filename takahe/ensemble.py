@@ -1,9 +1,18 @@
+import hashlib
+
+import numba
 import numpy as np
-import matplotlib.pyplot as plt
 
 import takahe
 from takahe.constants import *
-from kea.hist import BPASS_hist, histogram
+
+# The parameters stored (column-wise) for each system in the ensemble.
+_COLUMNS = ['m1', 'm2', 'a0', 'e0', 'beta', 'weight', 'evolution_age',
+            'rejuvenation_age', 'coalescence_time']
+
+# Every column held by the ensemble: the parameters above, and the number
+# of physical systems each entry represents.
+_STORED_COLUMNS = _COLUMNS + ['multiplicity']
 
 def create():
     """Creates a BinaryStarSystemEnsemble object (i.e., a collection of
@@ -16,29 +25,60 @@ def create():
     """
     return BinaryStarSystemEnsemble()
 
+def _fill_histogram(hist, counts, edges):
+    """Fills a (kea) histogram with precomputed bin contents.
+
+    Arguments:
+        hist {kea.hist.histogram} -- The histogram to fill. Its bins
+                                     must correspond to edges.
+        counts {ndarray} -- The content of each bin.
+        edges {ndarray} -- The bin edges.
+    """
+    for i in range(len(counts)):
+        hist.Fill(edges[i], counts[i], ty="lin")
+
+def _as_count(total):
+    """Returns a summed multiplicity as an int, if it is integral."""
+    if float(total).is_integer():
+        return int(total)
+
+    return float(total)
+
 class BinaryStarSystemEnsemble:
     """Represents a collection of binary star systems.
 
     Represents a group of binary star system objects. Will be
     generated if the loader encounters a group of BSS objects (e.g.,
     from BPASS).
+
+    Internally the ensemble is stored column-wise: each parameter of
+    the binary star systems (m1, m2, a0, e0, beta, weight,
+    evolution_age, rejuvenation_age and coalescence_time) is held in a
+    contiguous NumPy array, in the same units as BinaryStarSystem.get()
+    returns them. BinaryStarSystem objects are only constructed when
+    they are requested (e.g. through indexing or iteration).
+
+    Each entry carries a multiplicity: the number of identical physical
+    systems it stands for (e.g. weight * mass for a BPASS stellar type).
+    size() and the population statistics count systems, whereas len(),
+    indexing and iteration work over entries.
     """
 
     def __init__(self):
-        self.__ensemble = []
+        self.__columns = {key: np.empty(0, dtype=np.float64)
+                          for key in _STORED_COLUMNS}
         self.__count = 0
-        self.__pointer = 0
-        self.__min_lifetime = np.infty
-        self.__max_lifetime = 0
-        self.__total_mass = 0
+        self.__lifetime_index = None
+        self.__version = 0
+        self.__digest = None
 
     def track_through_phase_space(self, in_range=(0, 0)):
         """Tracks an entire ensemble as each star evolves through phase
         space.
 
-        Given an ensemble of stars, propagates them through time and
-        uses the track_evolution() method of the BinaryStarSystem class
-        to create a 3D phase-space plot of the ensemble.
+        Given an ensemble of stars, propagates them all through time
+        with evolve_all() and creates a 3D phase-space plot of the
+        ensemble, in the style of BinaryStarSystem.track_evolution().
 
         Keyword Arguments:
             in_range {tuple} -- The range you would like all coalescences
@@ -55,13 +95,305 @@ class BinaryStarSystemEnsemble:
         else:
             ensemble = self
 
+        t, a, e = ensemble.evolve_all(n_samples=1000)
+
+        m1 = ensemble.column('m1')
+        m2 = ensemble.column('m2')
+
         ax = None
 
-        for star in ensemble:
-            ax = star.track_evolution(ax=ax)
+        for i in range(len(ensemble)):
+            ax = takahe.BSS._plot_track(t[i], a[i], e[i], m1[i], m2[i], ax)
 
         return ax
 
+    def evolve_all(self, t_grid=None, n_samples=None, final_only=False,
+                   rtol=1e-8, atol=1e-10, threads=None, method='adaptive',
+                   event=None, kernel='peters', kernel_params=()):
+        """Evolves every system in the ensemble in time.
+
+        Batched counterpart to BinaryStarSystem.evolve_until(). The
+        systems are integrated with the adaptive RKF45 integrator,
+        straight from the columns of the ensemble, in parallel across
+        numba's threads. As with evolve_until(), time is measured from
+        the start of each system's inspiral (i.e. when its SMA is a0).
+        Set method to "emulator" to evaluate the self-similar Peters
+        solution instead (see takahe.peters.emulate), which is much
+        faster and ignores rtol, atol and threads. The integrator can
+        also stop each system at an event (see
+        takahe.BSS.resolve_event), e.g. when it reaches its ISCO, and
+        can evolve the systems with extra physics (see takahe.kernels).
+
+        Exactly one of t_grid and n_samples must be given.
+
+        Keyword Arguments:
+            t_grid {array} -- Times (in gigayears) to evolve every system
+                              to. (default: {None})
+            n_samples {int} -- The number of evenly spaced times, between
+                               0 and each system's coalescence time, to
+                               evolve the system to. (default: {None})
+            final_only {bool} -- Only return the state of each system at
+                                 the last of its times. (default: {False})
+            rtol {float} -- The relative tolerance of the integrator.
+                            (default: {1e-8})
+            atol {float} -- The absolute tolerance of the integrator,
+                            relative to a0 for the SMA.
+                            (default: {1e-10})
+            threads {int} -- The number of threads to use. Set to None to
+                             use numba's default. (default: {None})
+            method {str} -- "adaptive" or "emulator".
+                            (default: {"adaptive"})
+            event {str/tuple} -- The event to stop each system at. Set
+                                 to None to not stop early.
+                                 (default: {None})
+            kernel {str/function} -- The RHS kernel, or the name it is
+                                     registered under in takahe.kernels.
+                                     (default: {"peters"})
+            kernel_params {array} -- The parameters of the RHS kernel,
+                                     either shared by all systems or as
+                                     a 2D array with one row per system.
+                                     (default: {()})
+
+        Returns:
+            mixed -- A 3-tuple containing the time array (in gigayears),
+                     and the resultant SMA (in solar radii) and
+                     eccentricity arrays. The latter are 2D, with one row
+                     per system (or 1D if final_only is True), and are
+                     NaN once a system has merged. The time array is
+                     t_grid if given, and otherwise has the same shape
+                     as the SMA array. If an event is given, a 4-tuple
+                     which also contains a 2D array of the time (in
+                     gigayears), SMA (in solar radii) and eccentricity
+                     of each system at its event, NaN if it did not
+                     happen.
+
+        Raises:
+            ValueError -- if not exactly one of t_grid and n_samples
+                          is given, if method is not "adaptive" or
+                          "emulator", or if an event or a kernel other
+                          than "peters" is given with the emulator.
+        """
+        if (t_grid is None) == (n_samples is None):
+            raise ValueError("Exactly one of t_grid and n_samples must be provided!")
+
+        if method not in ('adaptive', 'emulator'):
+            raise ValueError("method must be either adaptive or emulator")
+
+        rhs = takahe.kernels.get_kernel(kernel)
+        rhs_params = np.atleast_2d(np.asarray(kernel_params,
+                                              dtype=np.float64))
+        rhs_params = np.ascontiguousarray(
+            np.broadcast_to(rhs_params, (self.__count, rhs_params.shape[1])))
+
+        if method == 'emulator' and rhs is not takahe.helpers.peters_rhs:
+            raise ValueError("The emulator only supports the Peters kernel!")
+
+        if event is None:
+            event_function = takahe.helpers.no_event
+            event_params = np.empty((self.__count, 0))
+        elif method == 'emulator':
+            raise ValueError("Events require the adaptive method!")
+        else:
+            event_function, event_params = takahe.BSS.resolve_event(
+                event, self.column('m1'), self.column('m2'))
+
+        N = self.__count
+
+        if t_grid is not None:
+            t = np.asarray(t_grid, dtype=np.float64)
+            t_eval = np.broadcast_to(t, (N, len(t)))
+        else:
+            fractions = np.linspace(0, 1, n_samples)
+            t = self.column('coalescence_time')[:, None] * fractions
+            t_eval = t
+
+        if final_only:
+            t_eval = t_eval[:, -1:]
+            t = t_eval[:, 0]
+
+        t_eval = np.ascontiguousarray(t_eval * 1e9 * 60 * 60 * 24 * 365.25)
+
+        if method == 'emulator':
+            a, e = takahe.peters.emulate(self.column('a0')[:, None],
+                                         self.column('e0')[:, None],
+                                         self.column('beta')[:, None],
+                                         t_eval)
+        else:
+            default_threads = numba.get_num_threads()
+
+            if threads is not None:
+                numba.set_num_threads(threads)
+
+            try:
+                a, e, events = takahe.helpers.integrate_ensemble(
+                    t_eval,
+                    self.column('a0'),
+                    self.column('e0'),
+                    self.column('beta'),
+                    rtol, atol,
+                    rhs, rhs_params,
+                    event_function, event_params)
+            finally:
+                numba.set_num_threads(default_threads)
+
+        # Convert quantities back into Solar Units
+        a /= (Solar_Radii * 1000)
+
+        if final_only:
+            a = a[:, 0]
+            e = e[:, 0]
+
+        if event is None:
+            return t, a, e
+
+        events[:, 0] /= 1e9 * 60 * 60 * 24 * 365.25
+        events[:, 1] /= (Solar_Radii * 1000)
+
+        return t, a, e, events
+
+    def classify_circularisation(self, thresholds=(0.0, 2*Solar_Radii),
+                                 method='analytic', rtol=1e-8, atol=1e-10,
+                                 threads=None, kernel='peters',
+                                 kernel_params=(), t_max=None):
+        """Determines which systems in the ensemble circularise.
+
+        Batched counterpart to BinaryStarSystem.circularises(). A system
+        circularises if its eccentricity falls to the eccentricity
+        threshold while its SMA is still above the SMA threshold. As
+        with np.isclose, eccentricities within 1e-8 of the threshold
+        count as having reached it.
+
+        The analytic method uses the Peters a(e) relation (see
+        takahe.peters.circularises). The integrate method instead
+        integrates each system, in parallel across numba's threads,
+        only until the outcome is known, and can evolve the systems
+        with extra physics (see takahe.kernels).
+
+        Keyword Arguments:
+            thresholds {tuple} -- The eccentricity threshold, and the SMA
+                                  threshold (in km).
+                                  (default: {(0, 2*Solar_Radii)})
+            method {str} -- "analytic" or "integrate".
+                            (default: {"analytic"})
+            rtol {float} -- The relative tolerance of the integrator.
+                            (default: {1e-8})
+            atol {float} -- The absolute tolerance of the integrator,
+                            relative to a0 for the SMA.
+                            (default: {1e-10})
+            threads {int} -- The number of threads to use. Set to None to
+                             use numba's default. (default: {None})
+            kernel {str/function} -- The RHS kernel, or the name it is
+                                     registered under in takahe.kernels.
+                                     (default: {"peters"})
+            kernel_params {array} -- The parameters of the RHS kernel,
+                                     either shared by all systems or as
+                                     a 2D array with one row per system.
+                                     (default: {()})
+            t_max {float} -- The time (in gigayears) to integrate each
+                             system for at most. Set to None to use
+                             just over each system's Peters coalescence
+                             time, which suffices unless the kernel
+                             slows the inspiral. (default: {None})
+
+        Returns:
+            {ndarray} -- A boolean mask, True where the system
+                         circularises.
+
+        Raises:
+            ValueError -- if method is not "analytic" or "integrate", or
+                          if a kernel other than "peters" is given with
+                          the analytic method.
+        """
+        e_threshold = thresholds[0] + 1e-8
+        a_threshold = thresholds[1] * 1000 # Units: m, like a0
+
+        rhs = takahe.kernels.get_kernel(kernel)
+        rhs_params = np.atleast_2d(np.asarray(kernel_params,
+                                              dtype=np.float64))
+        rhs_params = np.ascontiguousarray(
+            np.broadcast_to(rhs_params, (self.__count, rhs_params.shape[1])))
+
+        if method == 'analytic' and rhs is not takahe.helpers.peters_rhs:
+            raise ValueError("The analytic method only supports the Peters kernel!")
+
+        if method == 'analytic':
+            return takahe.peters.circularises(self.column('a0'),
+                                              self.column('e0'),
+                                              e_threshold,
+                                              a_threshold)
+        elif method != 'integrate':
+            raise ValueError("method must be either analytic or integrate")
+
+        if t_max is None:
+            # Generous bounds on the time to merger.
+            t_max = 1.01 * self.coalescence_times(mode='exact')
+
+        t1 = np.broadcast_to(np.asarray(t_max, dtype=np.float64)
+                             * 1e9 * 60 * 60 * 24 * 365.25, (self.__count,))
+
+        default_threads = numba.get_num_threads()
+
+        if threads is not None:
+            numba.set_num_threads(threads)
+
+        try:
+            return takahe.helpers.classify_ensemble(t1,
+                                                    self.column('a0'),
+                                                    self.column('e0'),
+                                                    self.column('beta'),
+                                                    e_threshold,
+                                                    a_threshold,
+                                                    rtol, atol,
+                                                    rhs, rhs_params)
+        finally:
+            numba.set_num_threads(default_threads)
+
+    def snapshot(self, times):
+        """Computes the orbits of the inspiralling systems at given ages.
+
+        A system is inspiralling at age t (measured from the birth of
+        the population) if it has formed its compact binary, i.e.
+        t >= (evolution_age + rejuvenation_age), and has not yet merged
+        according to the exact Peters coalescence time (see
+        takahe.peters.coalescence_time). The orbits are evaluated from
+        the self-similar Peters solution (see takahe.peters.emulate),
+        in parallel across numba's threads.
+
+        Arguments:
+            times {array} -- The ages to take snapshots at (in gigayears)
+
+        Returns:
+            mixed -- A 4-tuple containing the SMA (in solar radii),
+                     eccentricity and orbital frequency (in Hz) arrays,
+                     and the multiplicity of each system. The first
+                     three have one row per time and one column per
+                     system, and are NaN where a system is not
+                     inspiralling.
+        """
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+
+        start = (self.column('evolution_age')
+               + self.column('rejuvenation_age')) / 1e9
+        tau = self.coalescence_times(mode='exact')
+
+        log_I, log_e = takahe.peters._inverse_table()
+
+        a, e = takahe.helpers.snapshot_ensemble(times,
+                                                start,
+                                                self.column('a0'),
+                                                self.column('e0'),
+                                                tau,
+                                                log_I,
+                                                log_e)
+
+        M = self.column('m1') + self.column('m2')
+        f_orb = np.sqrt(G * M / a**3) / (2 * np.pi)
+
+        # Convert quantities back into Solar Units
+        a /= (Solar_Radii * 1000)
+
+        return a, e, f_orb, self.column('multiplicity').copy()
+
     def get(self, key):
         """Fetches a given parameter of the binary system.
 
@@ -74,10 +406,56 @@ class BinaryStarSystemEnsemble:
         Arguments:
             key {string} -- The key to look up.
         """
-        return {'mass': self.__total_mass / Solar_Mass,
-                'size': self.size(),
-                'lifetime': (self.__min_lifetime, self.__max_lifetime)
-                }[key]
+        if key == 'mass':
+            total_mass = np.sum((self.column('m1') + self.column('m2'))
+                                * self.column('multiplicity'))
+            return total_mass / Solar_Mass
+        elif key == 'size':
+            return self.size()
+        elif key == 'lifetime':
+            if self.__count == 0:
+                return (np.inf, 0)
+            lifetimes = self.lifetimes()
+            return (lifetimes.min(), lifetimes.max())
+
+        raise KeyError(key)
+
+    def column(self, key):
+        """Fetches a given parameter for every system in the ensemble.
+
+        Arguments:
+            key {string} -- The parameter to fetch. Must be one of m1,
+                            m2, a0, e0, beta, weight, evolution_age,
+                            rejuvenation_age, coalescence_time or
+                            multiplicity.
+
+        Returns:
+            {ndarray} -- A (read-only) array of the parameter, in the
+                         same units as BinaryStarSystem.get().
+
+        Raises:
+            ValueError -- If the parameter requested does not exist.
+        """
+        if key not in self.__columns:
+            raise ValueError("Key does not exist!")
+
+        view = self.__columns[key][:self.__count]
+        view.flags.writeable = False
+
+        return view
+
+    def lifetimes(self):
+        """Computes the total lifetime of every system in the ensemble.
+
+        Vectorised equivalent of BinaryStarSystem.lifetime().
+
+        Returns:
+            {ndarray} -- The lifetime of each BSS, in gigayears.
+        """
+        early_lifetime = self.column('rejuvenation_age') \
+                       + self.column('evolution_age')
+
+        return early_lifetime / 1e9 + self.column('coalescence_time')
 
     def find_coalescence_between(self, in_range, find_all=False):
         """Find a system that coalesces within a range of time.
@@ -106,50 +484,111 @@ class BinaryStarSystemEnsemble:
         Raises:
             LookupError -- if the finder could not find a suitable BSS
         """
-        i = 0
-
         high = max(in_range)
         low = min(in_range)
 
-        found = takahe.ensemble.create()
+        coalescence_times = self.column('coalescence_time')
+        mask = (coalescence_times < high) & (coalescence_times > low)
+        indices = np.flatnonzero(mask)
 
-        for star in self:
-            coalescence_time = star.get('coalescence_time')
-            if coalescence_time < high and coalescence_time > low:
-                if not find_all:
-                    return i, star
-                found.add(star)
-            i += 1
+        if indices.size > 0:
+            if not find_all:
+                i = int(indices[0])
+                return i, self[i]
 
-        if found.size() > 0:
+            found = takahe.ensemble.create()
+            found._append({key: self.column(key)[indices]
+                           for key in _STORED_COLUMNS})
             return found
 
         raise LookupError("A suitable star system was not found!")
 
-    def add(self, binary_star):
+    def add(self, binary_star, multiplicity=1):
         """Add a BSS to the current ensemble.
 
         Arguments:
             binary_star {BinaryStarSystem} -- The BSS to add.
 
+        Keyword Arguments:
+            multiplicity {number} -- The number of identical systems
+                                     this BSS represents. Need not be
+                                     an integer. (default: {1})
+
         Raises:
             TypeError -- If the Binary Star System is not an instance of
                          BinaryStarSystem.
+            ValueError -- If the multiplicity is negative.
         """
         if not isinstance(binary_star, takahe.BSS.BinaryStarSystem):
             raise TypeError("binary_star must be an instance \
                              of BinaryStarSystem!")
 
-        lifetime = binary_star.lifetime()
+        if multiplicity < 0:
+            raise ValueError("multiplicity must be non-negative!")
+
+        columns = {key: binary_star.get(key) for key in _COLUMNS}
+        columns['multiplicity'] = multiplicity
+
+        self._append(columns)
 
-        if lifetime > self.__max_lifetime:
-            self.__max_lifetime = lifetime
-        elif lifetime < self.__min_lifetime:
-            self.__min_lifetime = lifetime
+    def add_columns(self, columns):
+        """Adds many systems to the ensemble at once.
 
-        self.__ensemble.append(binary_star)
-        self.__count += 1
-        self.__total_mass += binary_star.get('m1') + binary_star.get('m2')
+        Columnar counterpart to add(), which skips constructing
+        BinaryStarSystem objects.
+
+        Arguments:
+            columns {dict} -- A mapping of every name in _STORED_COLUMNS
+                              to an array of values (in the units used
+                              by BinaryStarSystem.get()).
+
+        Raises:
+            KeyError -- If a column is missing.
+            ValueError -- If a multiplicity is negative.
+        """
+        missing = [key for key in _STORED_COLUMNS if key not in columns]
+
+        if missing:
+            raise KeyError(f"Missing columns: {', '.join(missing)}")
+
+        if np.any(np.asarray(columns['multiplicity']) < 0):
+            raise ValueError("multiplicity must be non-negative!")
+
+        self._append(columns)
+
+    def _append(self, columns):
+        """Appends one or more rows to the ensemble.
+
+        The column arrays grow geometrically, so that repeatedly adding
+        single systems is amortised O(1).
+
+        Arguments:
+            columns {dict} -- A mapping of every name in
+                              _STORED_COLUMNS to a scalar or array of
+                              values (in the units used by
+                              BinaryStarSystem.get()).
+        """
+        columns = {key: np.atleast_1d(np.asarray(columns[key],
+                                                 dtype=np.float64))
+                   for key in _STORED_COLUMNS}
+
+        n_new = len(columns['m1'])
+        required = self.__count + n_new
+        capacity = len(self.__columns['m1'])
+
+        if required > capacity:
+            capacity = max(required, 2 * capacity, 16)
+            for key in _STORED_COLUMNS:
+                grown = np.empty(capacity, dtype=np.float64)
+                grown[:self.__count] = self.__columns[key][:self.__count]
+                self.__columns[key] = grown
+
+        for key in _STORED_COLUMNS:
+            self.__columns[key][self.__count:required] = columns[key]
+
+        self.__count = required
+        self.__lifetime_index = None
+        self.__version += 1
 
     def average_coalescence_time(self):
         """Computes the average coalescence time for the binary star
@@ -157,22 +596,41 @@ class BinaryStarSystemEnsemble:
 
         Returns:
             float -- The average over all the coalescence times in the
-                     ensemble.
+                     ensemble, weighted by multiplicity.
         """
+        weighted = self.column('coalescence_time') \
+                 * self.column('multiplicity')
 
-        running_sum = 0
+        return np.sum(weighted) / self.size()
 
-        for binary_star in self.__ensemble:
-            running_sum += binary_star.get('coalescence_time')
+    def coalescence_times(self, mode='exact'):
+        """Computes the coalescence time of every system in the ensemble.
 
-        return running_sum / self.size()
+        Unlike get_cts(), which returns the stored coalescence times,
+        this recomputes them from a0, e0 and beta (see
+        takahe.peters.coalescence_time).
+
+        Keyword Arguments:
+            mode {str} -- "approx" or "exact". (default: {"exact"})
+
+        Returns:
+            {ndarray} -- The coalescence times (in gigayears).
+        """
+        return takahe.peters.coalescence_time(self.column('a0'),
+                                              self.column('e0'),
+                                              self.column('beta'),
+                                              mode)
 
     def get_cts(self):
-        cts = []
-        for star in self:
-            cts.append(star.get('coalescence_time'))
+        """Fetches the coalescence times of every entry in the ensemble.
+
+        Each entry appears once; use column('multiplicity') to weight
+        them (e.g. when histogramming).
 
-        return cts
+        Returns:
+            {ndarray} -- The coalescence times (in gigayears).
+        """
+        return self.column('coalescence_time').copy()
 
     def merge_rate(self, t_merge, return_as="rel"):
         """Computes the merge rate for this ensemble.
@@ -182,10 +640,16 @@ class BinaryStarSystemEnsemble:
         some timespan t_merge (optionally relative to the number of
         systems in the ensemble).
 
+        Uses a sorted index of the lifetimes, so each lookup is a
+        binary search rather than a pass over the ensemble.
+
         Arguments:
-            t_merge {float} -- The timespan under consideration. Must be
-                               in gigayears; no conversion is
-                               performed before comparison.
+            t_merge {float/ndarray} -- The timespan under consideration.
+                                       Must be in gigayears; no
+                                       conversion is performed before
+                                       comparison. If an array is
+                                       given, the merge rate is
+                                       computed for every entry.
 
         Keyword Arguments:
             return_as {str} -- "abs" or "rel" depending on whether the
@@ -197,44 +661,140 @@ class BinaryStarSystemEnsemble:
                                [0, 1]. (default: {"rel"})
 
         Returns:
-            float -- The merge rate of the ensemble.
+            float/ndarray -- The merge rate of the ensemble.
 
         Raises:
             ValueError -- if return_as is anything other than "abs" or
                           "rel".
         """
-        count = 0
-
         if return_as.lower() not in ['abs', 'rel']:
             raise ValueError("return_as must be either abs or rel")
 
-        for i in range(self.__count):
-            binary_star = self.__ensemble[i]
-            valid = (binary_star.lifetime() <= t_merge)
-            if valid:
-                count += 1
+        lifetimes, cumulative = self._lifetime_index()
+
+        position = np.searchsorted(lifetimes, t_merge, side='right')
+        count = cumulative[position]
+
+        if np.ndim(count) == 0:
+            count = _as_count(count)
+        elif np.all(np.mod(count, 1) == 0):
+            count = count.astype(np.int64)
 
         if return_as == 'abs':
             return count
         elif return_as == 'rel':
-            return count / self.__count
+            return count / self.size()
 
-    def compute_existence_time_distribution(self, *argv, **kwargs):
-        hist = BPASS_hist()
-        edges = hist.getLinEdges()
+    def _lifetime_index(self):
+        """Fetches the sorted lifetime index of the ensemble.
+
+        The index is built on first use and discarded whenever the
+        ensemble changes.
+
+        Returns:
+            {tuple} -- A 2-tuple of the sorted lifetimes (in gigayears)
+                       and the cumulative multiplicity, where the i-th
+                       entry of the latter is the number of systems with
+                       the i smallest lifetimes (so it starts at 0).
+        """
+        if self.__lifetime_index is None:
+            lifetimes = self.lifetimes()
+            order = np.argsort(lifetimes, kind='stable')
+
+            cumulative = np.zeros(self.__count + 1)
+            np.cumsum(self.column('multiplicity')[order],
+                      out=cumulative[1:])
+
+            self.__lifetime_index = (lifetimes[order], cumulative)
+
+        return self.__lifetime_index
 
-        old_mr = 0
-        for bin in range(0, hist.getNBins()-1):
-            mr = self.merge_rate(edges[bin+1], return_as='abs')
-            this_mr = (mr - old_mr)
-            plt_mr = self.size() - this_mr
-            hist.Fill(edges[bin], plt_mr, ty="lin")
-            old_mr += this_mr
+    def delay_time_distribution(self, edges=None, normalise=True):
+        """Computes the delay-time distribution (DTD) of this ensemble.
 
-        bin_widths = [hist.getBinWidth(i) for i in range(0,hist.getNBins())]
-        hist = hist / 1e6 / bin_widths
+        Pure computational counterpart to the histogram-producing
+        methods: the DTD is evaluated in a single pass over the sorted
+        lifetime index, and nothing is plotted.
 
-        hist.plotLog(*argv, **kwargs)
+        Bin i counts the systems whose lifetime t satisfies
+        edges[i] < t <= edges[i+1], weighted by multiplicity.
+
+        Keyword Arguments:
+            edges {ndarray} -- The (monotonically increasing) bin edges,
+                               in gigayears. Set to None to use the BPASS
+                               time bins. (default: {None})
+            normalise {bool} -- Whether to normalise the counts to
+                                events / 10^6 M_sun / Gyr, as done by
+                                BPASS. (default: {True})
+
+        Returns:
+            {tuple} -- A 2-tuple of the DTD (one entry per bin) and the
+                       bin edges used.
+        """
+        if edges is None:
+            edges = BPASS_TIME_EDGES
+
+        edges = np.asarray(edges, dtype=np.float64)
+
+        counts = np.diff(self.merge_rate(edges, return_as='abs'))
+        counts = counts.astype(np.float64)
+
+        if normalise:
+            counts = counts / 1e6 / np.diff(edges)
+
+        return counts, edges
+
+    def existence_time_distribution(self, edges=None, normalise=True):
+        """Computes the existence-time distribution of this ensemble.
+
+        For every bin, counts the systems in the ensemble that do *not*
+        merge within it. Like delay_time_distribution(), this does not
+        plot anything.
+
+        Keyword Arguments:
+            edges {ndarray} -- The (monotonically increasing) bin edges,
+                               in gigayears. Set to None to use the BPASS
+                               time bins. (default: {None})
+            normalise {bool} -- Whether to normalise the counts to
+                                systems / 10^6 M_sun / Gyr.
+                                (default: {True})
+
+        Returns:
+            {tuple} -- A 2-tuple of the distribution (one entry per bin)
+                       and the bin edges used.
+        """
+        merges, edges = self.delay_time_distribution(edges, normalise=False)
+        counts = self.size() - merges
+
+        if normalise:
+            counts = counts / 1e6 / np.diff(edges)
+
+        return counts, edges
+
+    def compute_existence_time_distribution(self, *argv, plot=True, **kwargs):
+        """Generates the existence time plot for this ensemble.
+
+        Wraps existence_time_distribution() in a (kea-generated)
+        histogram over the BPASS time bins, and optionally plots it.
+        Any extra arguments are passed to kea's plotLog.
+
+        Keyword Arguments:
+            plot {bool} -- Whether to plot the histogram.
+                           (default: {True})
+
+        Returns:
+            hist -- the (kea-generated) histogram object.
+        """
+        from kea.hist import BPASS_hist
+
+        hist = BPASS_hist()
+        edges = np.asarray(hist.getLinEdges()[:hist.getNBins()+1])
+
+        counts, edges = self.existence_time_distribution(edges)
+        _fill_histogram(hist, counts, edges)
+
+        if plot:
+            hist.plotLog(*argv, **kwargs)
 
         return hist
 
@@ -246,8 +806,9 @@ class BinaryStarSystemEnsemble:
         developed further, and may be removed in a future release.
 
         Computes the instantaneous delay-time distribution for this
-        ensemble. Returns the histogram generated, however the histogram
-        is saved internally in Kea as a matplotlib plot.
+        ensemble (see delay_time_distribution(), which this wraps)
+        over the BPASS time bins. Returns the histogram generated,
+        which Kea can render as a matplotlib plot.
 
         Thus, given an ensemble called ens, one may use
 
@@ -265,30 +826,56 @@ class BinaryStarSystemEnsemble:
         Returns:
             hist -- the (kea-generated) histogram object.
         """
+        from kea.hist import BPASS_hist
 
         hist = BPASS_hist()
-        old_mr = 0
-        edges = hist.getLinEdges()
-        bin_widths = np.array([])
+        edges = np.asarray(hist.getLinEdges()[:hist.getNBins()+1])
 
-        for bin in range(0, hist.getNBins()):
-            mr = self.merge_rate(edges[bin], return_as='abs')
-            this_mr = mr - old_mr
-            hist.Fill(edges[bin], this_mr, ty="lin")
-            old_mr += this_mr
-            bin_widths = np.append(bin_widths, hist.getBinWidth(bin))
-
-        hist = hist / 1e6 / bin_widths
+        counts, edges = self.delay_time_distribution(edges)
+        _fill_histogram(hist, counts, edges)
 
         return hist
 
+    def version(self):
+        """Get the version of the ensemble.
+
+        The version increases every time systems are added, so that
+        results computed from the ensemble can tell if it has changed.
+
+        Returns:
+            int -- The version of the ensemble.
+        """
+        return self.__version
+
+    def digest(self):
+        """Get a hash of the contents of the ensemble.
+
+        Two ensembles holding the same systems (in the same order) have
+        the same digest, which is used to key cached results (see
+        takahe.cache).
+
+        Returns:
+            str -- The (hexadecimal SHA-256) digest.
+        """
+        if self.__digest is None or self.__digest[0] != self.__version:
+            digest = hashlib.sha256()
+            for key in _STORED_COLUMNS:
+                digest.update(self.__columns[key][:self.__count].tobytes())
+
+            self.__digest = (self.__version, digest.hexdigest())
+
+        return self.__digest[1]
+
     def size(self):
         """Get the size of the ensemble.
 
+        Counts every system represented by the ensemble, i.e. the sum of
+        the multiplicities of its entries.
+
         Returns:
             int -- The number of BSS in the ensemble.
         """
-        return self.__count
+        return _as_count(np.sum(self.column('multiplicity')))
 
     """
     Magic methods, in order to be able to compute the size of the
@@ -296,17 +883,149 @@ class BinaryStarSystemEnsemble:
     and therefore do not contain any docstrings.
     """
     def __getitem__(self, key):
-        return self.__ensemble[key]
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(self.__count))]
+
+        if key < 0:
+            key += self.__count
+        if key < 0 or key >= self.__count:
+            raise IndexError("ensemble index out of range")
+
+        row = {k: self.__columns[k][key] for k in _COLUMNS}
+
+        extra_terms = {k: row[k] for k in ['weight', 'evolution_age',
+                                           'rejuvenation_age',
+                                           'coalescence_time']}
+
+        return takahe.BSS.create(row['m1'] / Solar_Mass,
+                                 row['m2'] / Solar_Mass,
+                                 row['a0'] / (Solar_Radii * 1000),
+                                 row['e0'],
+                                 extra_terms)
 
     def __len__(self):
-        return self.size()
+        return self.__count
 
     def __iter__(self):
-        return self
+        for i in range(self.__count):
+            yield self[i]
 
-    def __next__(self):
-        if self.__pointer >= self.__count:
-            raise StopIteration
-        else:
-            self.__pointer += 1
-            return self.__ensemble[self.__pointer - 1]
+class EnsembleAccumulator:
+    """Accumulates the population statistics of an ensemble in chunks.
+
+    Holds only running totals, so that a population too large to hold
+    as one ensemble (e.g. a whole BPASS file, see
+    takahe.load.iter_chunks) can be processed in bounded memory. The
+    merge rate and DTD are accumulated on a fixed set of time edges.
+    """
+
+    def __init__(self, edges=None):
+        if edges is None:
+            edges = BPASS_TIME_EDGES
+
+        self.edges = np.asarray(edges, dtype=np.float64)
+
+        self.__merged = np.zeros(len(self.edges))
+        self.__size = 0
+        self.__entries = 0
+        self.__ct_sum = 0.0
+        self.__ct_square_sum = 0.0
+
+    def add(self, ensemble):
+        """Adds an ensemble (e.g. a chunk of a population) to the totals.
+
+        Arguments:
+            ensemble {BinaryStarSystemEnsemble} -- The ensemble to add.
+        """
+        ct = ensemble.column('coalescence_time')
+        multiplicity = ensemble.column('multiplicity')
+
+        self.__merged += ensemble.merge_rate(self.edges, return_as='abs')
+        self.__size += np.sum(multiplicity)
+        self.__entries += len(ensemble)
+        self.__ct_sum += np.sum(ct * multiplicity)
+        self.__ct_square_sum += np.sum(ct**2 * multiplicity)
+
+    def size(self):
+        """The number of systems added, counting multiplicity."""
+        return _as_count(self.__size)
+
+    def __len__(self):
+        """The number of entries added."""
+        return self.__entries
+
+    def merge_rate(self, return_as="rel"):
+        """Computes the merge rate at every edge.
+
+        See BinaryStarSystemEnsemble.merge_rate.
+
+        Keyword Arguments:
+            return_as {str} -- "abs" or "rel". (default: {"rel"})
+
+        Returns:
+            {ndarray} -- The merge rate within each of the edges.
+
+        Raises:
+            ValueError -- if return_as is anything other than "abs" or
+                          "rel".
+        """
+        if return_as.lower() not in ['abs', 'rel']:
+            raise ValueError("return_as must be either abs or rel")
+
+        if return_as.lower() == 'rel':
+            return self.__merged / self.__size
+
+        return self.__merged.copy()
+
+    def delay_time_distribution(self, normalise=True):
+        """Computes the delay-time distribution (DTD) on the edges.
+
+        See BinaryStarSystemEnsemble.delay_time_distribution.
+
+        Keyword Arguments:
+            normalise {bool} -- Whether to normalise the counts to
+                                events / 10^6 M_sun / Gyr, as done by
+                                BPASS. (default: {True})
+
+        Returns:
+            {tuple} -- A 2-tuple of the DTD and the bin edges.
+        """
+        counts = np.diff(self.__merged)
+
+        if normalise:
+            counts = counts / 1e6 / np.diff(self.edges)
+
+        return counts, self.edges
+
+    def average_coalescence_time(self):
+        """The average coalescence time, weighted by multiplicity."""
+        return self.__ct_sum / self.__size
+
+    def coalescence_time_std(self):
+        """The standard deviation of the coalescence times, weighted by
+        multiplicity."""
+        mean = self.average_coalescence_time()
+
+        return np.sqrt(max(self.__ct_square_sum / self.__size - mean**2, 0))
+
+def accumulate(chunks, edges=None):
+    """Accumulates the statistics of a population given in chunks.
+
+    Arguments:
+        chunks {iterable} -- The BinaryStarSystemEnsemble chunks (e.g.
+                             from takahe.load.iter_chunks).
+
+    Keyword Arguments:
+        edges {ndarray} -- The time edges to accumulate the merge rate
+                           and DTD on, in gigayears. Set to None to use
+                           the BPASS time bins. (default: {None})
+
+    Returns:
+        {EnsembleAccumulator} -- The accumulated statistics.
+    """
+    accumulator = EnsembleAccumulator(edges)
+
+    for chunk in chunks:
+        accumulator.add(chunk)
+
+    return accumulator
@@ -1,5 +1,5 @@
 import numpy as np
-from numba import njit
+from numba import njit, prange
 
 @njit
 def _dadt(t, a, e, beta):
@@ -62,64 +62,681 @@ def _coupled_eqs(t, p, beta):
     return np.array([_dadt(t, p[0], p[1], beta), _dedt(t, p[0], p[1], beta)])
 
 @njit
-def integrate(t_eval, a0, e0, beta):
+def peters_rhs(t, y, beta, params):
+    """
+    The Peters equations as a right-hand-side (RHS) kernel.
+
+    RHS kernels are numba-compiled functions rhs(t, y, beta, params)
+    returning the derivative [da/dt, de/dt] of the state y = [a, e],
+    which the integrators are specialised on. This one ignores params.
+    See takahe.kernels for others.
+    """
+    return _coupled_eqs(t, y, beta)
+
+@njit
+def _rkf45_step(t, yk, h, beta, k1, rhs, rhs_params):
+    """
+    Takes a single step of the RKF45 (Runge-Kutta-Fehlberg) method.
+
+    Arguments:
+        t {float} -- The current time
+        yk {ndarray} -- The current state [a, e]
+        h {float} -- The step size
+        beta {float} -- The beta constant of the system
+        k1 {ndarray} -- The derivative at (t, yk), which callers
+                        usually have from the previous step
+        rhs {function} -- The RHS kernel (see peters_rhs())
+        rhs_params {ndarray} -- The parameters of the RHS kernel
+
+    Returns:
+        y4 {ndarray} -- The fourth-order solution at t + h
+        y5 {ndarray} -- The fifth-order solution at t + h
+    """
+    k1 = h * k1
+    k2 = h * rhs(t + 1/4 * h, yk + 1/4 * k1, beta, rhs_params)
+
+    k3 = h * rhs(t + 3/8 * h, yk + 3/32 * k1 \
+                                         + 9/32 * k2, beta, rhs_params)
+
+    k4 = h * rhs(t+12/13 * h, yk + 1932/2197 * k1 \
+                                         - 7200/2197 * k2 \
+                                         + 7296/2197 * k3, beta, rhs_params)
+
+    k5 = h * rhs(t + h, yk + 439/216 * k1 \
+                                   - 8*k2 \
+                                   + 3680/513 * k3
+                                   - 845/4104*k4, beta, rhs_params)
+
+    k6 = h * rhs(t + 1/2 * h, yk - 8/27*k1 \
+                                         + 2*k2 \
+                                         - 3544/2565*k3 \
+                                         + 1859/4104 * k4 \
+                                         - 11/40 * k5, beta, rhs_params)
+
+    y4 = yk + 25/216 * k1 + 1408/2565*k3 + 2197/4104 * k4 - 1/5 * k5
+
+    y5 = yk + 16/135 * k1 + 6656/12825 * k3 + 28561/56430 * k4 \
+            - 9/50 * k5 + 2/55 * k6
+
+    return y4, y5
+
+@njit
+def _valid(y):
+    """
+    Checks that a state [a, e] is physical, i.e. the orbit has neither
+    collapsed (a <= 0) nor become unbound (e >= 1).
+    """
+    return y[0] > 0 and y[1] < 1 and np.isfinite(y[0]) and np.isfinite(y[1])
+
+@njit
+def _try_step(t, yk, fk, h, beta, rhs, rhs_params, rtol, atol):
+    """
+    Attempts a single step of the adaptive RKF45 integrator.
+
+    The step is accepted if
+
+        max_i |y5_i - y4_i| / (atol_i + rtol * |y_i|) <= 1
+
+    and the resulting state is physical (see _valid()).
+
+    Arguments:
+        t {float} -- The current time
+        yk {ndarray} -- The current state [a, e]
+        fk {ndarray} -- The derivative at (t, yk)
+        h {float} -- The step size
+        beta {float} -- The beta constant of the system
+        rhs {function} -- The RHS kernel (see peters_rhs())
+        rhs_params {ndarray} -- The parameters of the RHS kernel
+        rtol {float} -- The relative tolerance
+        atol {ndarray} -- The absolute tolerances for a and e
+
+    Returns:
+        y5 {ndarray} -- The fifth-order solution at t + h
+        error {float} -- The scaled error of the step, which is
+                         greater than 1 (infinite if the state is
+                         unphysical) if the step is rejected
+        h_next {float} -- The step size to try next
+    """
+    y4, y5 = _rkf45_step(t, yk, h, beta, fk, rhs, rhs_params)
+
+    if not _valid(y5):
+        return y5, np.inf, h / 4
+
+    scale = atol + rtol * np.maximum(np.abs(yk), np.abs(y5))
+    error = np.max(np.abs(y5 - y4) / scale)
+
+    if error > 1:
+        return y5, error, h * max(0.2, 0.9 * error**-0.2)
+    elif error == 0:
+        return y5, error, h * 5
+
+    return y5, error, h * min(5.0, 0.9 * error**-0.2)
+
+@njit
+def no_event(t, y, params):
+    """
+    An event which never happens, for integrating without events.
+    """
+    return 1.0
+
+@njit
+def separation_event(t, y, params):
+    """
+    An event which happens when the SMA falls to params[0].
+    """
+    return y[0] - params[0]
+
+@njit
+def eccentricity_event(t, y, params):
+    """
+    An event which happens when the eccentricity falls to params[0].
+    """
+    return y[1] - params[0]
+
+@njit
+def integrate(t_eval, a0, e0, beta, rhs, rhs_params, event, event_params):
     """
     Auxilary function which uses an RKF45 integrator to
         integrate the system of ODEs
 
+    Takes fixed steps of t_eval[1] - t_eval[0], and stops early if
+    the orbit collapses or becomes unbound, or once the event happens.
+
+    An event is a numba-compiled function event(t, y, params) of the
+    time, state [a, e] and event_params, which happens when it falls
+    to zero (or below) from above. Its time is found by bisection on
+    the interpolated solution within the step, see _locate_event().
+
     Arguments:
         t_eval {ndarray} -- An array of timesteps to compute
                             the integrals over
+        rhs {function} -- The RHS kernel (see peters_rhs())
+        rhs_params {ndarray} -- The parameters of the RHS kernel
+        event {function} -- The event function (see no_event())
+        event_params {ndarray} -- The parameters of the event
 
     Returns:
-        evolve_over {ndarray} -- An array representing the time
-                                 integrated over (in gigayears)
         a_arr {ndarray} -- An array representing the SMA of the
                            binary orbit (in solar radii)
         e_arr {ndarray} -- An array representing the
                            eccentricity of the binary orbit
+        event_state {ndarray} -- The time, SMA and eccentricity at the
+                                 event, which are NaN if it did not
+                                 happen
     """
 
     h = t_eval[1] - t_eval[0]
-    a, e = a0, e0
 
-    a_arr = []
-    e_arr = []
+    a_arr = np.empty(len(t_eval))
+    e_arr = np.empty(len(t_eval))
+
+    event_state = np.full(3, np.nan)
 
     # Implement the RKF45 algorithm.
-    yk = np.array([a, e])
+    yk = np.array([a0, e0])
+    n = 0
+
+    if event(t_eval[0], yk, event_params) <= 0:
+        a_arr[0] = yk[0]
+        e_arr[0] = yk[1]
+        event_state[0] = t_eval[0]
+        event_state[1:] = yk
+
+        return a_arr[:1], e_arr[:1], event_state
 
     for t in t_eval:
-        c1 = _coupled_eqs(t, yk, beta)
-        k1 = h * c1
-        k2 = h * _coupled_eqs(t + 1/4 * h, yk + 1/4 * k1, beta)
+        if not _valid(yk):
+            # runaway integration, we should kill it
+            break
 
-        k3 = h * _coupled_eqs(t + 3/8 * h, yk + 3/32 * k1 \
-                                             + 9/32 * k2, beta)
+        a_arr[n] = yk[0]
+        e_arr[n] = yk[1]
+        n += 1
 
-        k4 = h * _coupled_eqs(t+12/13 * h, yk + 1932/2197 * k1 \
-                                             - 7200/2197 * k2 \
-                                             + 7293/2197 * k3, beta)
+        fk = rhs(t, yk, beta, rhs_params)
+        y_next, _ = _rkf45_step(t, yk, h, beta, fk, rhs, rhs_params)
 
-        k5 = h * _coupled_eqs(t + h, yk + 439/216 * k1 \
-                                       - 8*k2 \
-                                       + 3680/513 * k3
-                                       - 845/4104*k4, beta)
+        if _valid(y_next) and event(t + h, y_next, event_params) <= 0:
+            event_state = _locate_event(event, event_params,
+                                        beta, rhs, rhs_params,
+                                        t, yk, fk, t + h, y_next)
+            break
 
-        k6 = h * _coupled_eqs(t + 1/2 * h, yk - 8/27*k1 \
-                                             + 2*k2 \
-                                             - 3544/2565*k3 \
-                                             + 1859/4104 * k4 \
-                                             - 11/40 * k5, beta)
+        yk = y_next
 
-        if e >= 1 or a <= 0:
-            # runaway integration, we should kill it
-            # t_eval = (t_eval[0], t_eval[-1], len(e_arr))
+    return a_arr[:n], e_arr[:n], event_state
+
+@njit
+def _hermite(t, t0, y0, f0, t1, y1, f1):
+    """
+    Evaluates the cubic Hermite interpolant through (t0, y0) and
+    (t1, y1), with derivatives f0 and f1, at t. Used for the dense
+    output of integrate_adaptive().
+    """
+    h = t1 - t0
+    s = (t - t0) / h
+
+    h00 = (1 + 2*s) * (1 - s)**2
+    h10 = s * (1 - s)**2
+    h01 = s**2 * (3 - 2*s)
+    h11 = s**2 * (s - 1)
+
+    return h00 * y0 + h10 * h * f0 + h01 * y1 + h11 * h * f1
+
+@njit
+def _locate_event(event, event_params, beta, rhs, rhs_params,
+                  t0, y0, f0, t1, y1):
+    """
+    Locates an event within a step from (t0, y0) to (t1, y1), i.e.
+    with event > 0 at t0 and <= 0 at t1.
+
+    The event time is found by bisecting the cubic Hermite interpolant
+    of the step down to a relative precision of 1e-15 in time.
+
+    Returns:
+        {ndarray} -- The time, SMA and eccentricity at the event.
+    """
+    f1 = rhs(t1, y1, beta, rhs_params)
+
+    lo = t0
+    hi = t1
+    y_hi = y1
+
+    for _ in range(200):
+        if hi - lo <= 1e-15 * abs(hi):
             break
 
-        a_arr.append(yk[0])
-        e_arr.append(yk[1])
+        mid = 0.5 * (lo + hi)
+        y_mid = _hermite(mid, t0, y0, f0, t1, y1, f1)
+
+        if event(mid, y_mid, event_params) <= 0:
+            hi = mid
+            y_hi = y_mid
+        else:
+            lo = mid
+
+    return np.array([hi, y_hi[0], y_hi[1]])
+
+@njit
+def integrate_adaptive(t0, t1, a0, e0, beta, rtol, atol, t_eval,
+                       rhs, rhs_params, event, event_params,
+                       max_steps=1000000):
+    """
+    Integrates the system of ODEs with an adaptive RKF45 integrator.
+
+    The step size is controlled by the difference between the
+    embedded fourth- and fifth-order solutions (see _try_step()), and
+    the fifth-order solution is propagated. Steps which would
+    collapse the orbit (a <= 0) or unbind it (e >= 1) are rejected
+    and retried with a smaller step, so the integration slows down
+    near merger. It stops at t1, after max_steps steps, once the
+    step size becomes negligible (i.e. at merger), or once the event
+    happens (see integrate()). The event is then the last point of
+    the solution.
+
+    Outputs are written into preallocated arrays. If t_eval is
+    empty, the solution is returned at every accepted step.
+    Otherwise it is returned at the times in t_eval (which must be
+    increasing, and no earlier than t0), interpolated between steps
+    with cubic Hermite polynomials; times beyond the end of the
+    integration are dropped.
+
+    Arguments:
+        t0 {float} -- The start of integration (in seconds)
+        t1 {float} -- The end of integration (in seconds)
+        a0 {float} -- The initial SMA (in km)
+        e0 {float} -- The initial eccentricity
+        beta {float} -- The beta constant of the system
+        rtol {float} -- The relative tolerance
+        atol {ndarray} -- The absolute tolerances for a and e
+        t_eval {ndarray} -- The times to output the solution at, or an
+                            empty array
+        rhs {function} -- The RHS kernel (see peters_rhs())
+        rhs_params {ndarray} -- The parameters of the RHS kernel
+        event {function} -- The event function (see no_event())
+        event_params {ndarray} -- The parameters of the event
+
+    Keyword Arguments:
+        max_steps {int} -- The maximum number of steps to take
+                           (default: {1000000})
+
+    Returns:
+        t_arr {ndarray} -- The times of the solution
+        a_arr {ndarray} -- The SMA at each time
+        e_arr {ndarray} -- The eccentricity at each time
+        event_state {ndarray} -- The time, SMA and eccentricity at the
+                                 event, which are NaN if it did not
+                                 happen
+    """
+    dense = len(t_eval) > 0
+
+    if dense:
+        size = len(t_eval)
+    else:
+        size = 1024
+
+    t_arr = np.empty(size)
+    y_arr = np.empty((size, 2))
+
+    t = t0
+    yk = np.array([a0, e0])
+    fk = rhs(t, yk, beta, rhs_params)
+
+    h = (t1 - t0) * 1e-3
+    h_min = (t1 - t0) * 1e-14
+
+    n = 0
+
+    if not dense:
+        t_arr[0] = t
+        y_arr[0] = yk
+        n = 1
+
+    while n < len(t_eval) and t_eval[n] <= t0:
+        t_arr[n] = t_eval[n]
+        y_arr[n] = yk
+        n += 1
+
+    event_state = np.full(3, np.nan)
+
+    if event(t, yk, event_params) <= 0:
+        event_state[0] = t
+        event_state[1:] = yk
+
+    steps = 0
+
+    while t < t1 and steps < max_steps and h > h_min \
+            and np.isnan(event_state[0]):
+        h = min(h, t1 - t)
+
+        y5, error, h_next = _try_step(t, yk, fk, h, beta, rhs, rhs_params,
+                                      rtol, atol)
+
+        if error > 1:
+            h = h_next
+            continue
+
+        steps += 1
+
+        t_new = t + h
+        f_new = rhs(t_new, y5, beta, rhs_params)
+
+        if event(t_new, y5, event_params) <= 0:
+            event_state = _locate_event(event, event_params,
+                                        beta, rhs, rhs_params,
+                                        t, yk, fk, t_new, y5)
+
+            # Finish the solution at the event.
+            t_new = event_state[0]
+            y5 = event_state[1:]
+            f_new = rhs(t_new, y5, beta, rhs_params)
+
+        if dense:
+            while n < size and t_eval[n] <= t_new:
+                t_arr[n] = t_eval[n]
+                y_arr[n] = _hermite(t_eval[n], t, yk, fk, t_new, y5, f_new)
+                n += 1
+        else:
+            if n == size:
+                size *= 2
+
+                grown_t = np.empty(size)
+                grown_t[:n] = t_arr[:n]
+                t_arr = grown_t
+
+                grown_y = np.empty((size, 2))
+                grown_y[:n] = y_arr[:n]
+                y_arr = grown_y
+
+            t_arr[n] = t_new
+            y_arr[n] = y5
+            n += 1
+
+        t = t_new
+        yk = y5
+        fk = f_new
+        h = h_next
+
+    return t_arr[:n], y_arr[:n, 0], y_arr[:n, 1], event_state
+
+@njit(parallel=True)
+def integrate_ensemble(t_eval, a0, e0, beta, rtol, atol, rhs, rhs_params,
+                       event, event_params):
+    """
+    Integrates many systems in parallel with the adaptive integrator.
+
+    Each system is integrated from t = 0 to the last of its output
+    times, or until its event, by integrate_adaptive(), with the
+    systems distributed over numba's threads.
+
+    Arguments:
+        t_eval {ndarray} -- A 2D array of the (increasing) times to
+                            output each system at, one row per system
+                            (in seconds)
+        a0 {ndarray} -- The initial SMA of each system (in km)
+        e0 {ndarray} -- The initial eccentricity of each system
+        beta {ndarray} -- The beta constant of each system
+        rtol {float} -- The relative tolerance
+        atol {float} -- The absolute tolerance (relative to a0 for
+                        the SMA)
+        rhs {function} -- The RHS kernel (see peters_rhs())
+        rhs_params {ndarray} -- A 2D array of the parameters of the
+                                RHS kernel, one row per system
+        event {function} -- The event function (see no_event())
+        event_params {ndarray} -- A 2D array of the parameters of the
+                                  event, one row per system
+
+    Returns:
+        a_arr {ndarray} -- A 2D array of the SMA of each system at
+                           each time. NaN after the system merged.
+        e_arr {ndarray} -- A 2D array of the eccentricity of each
+                           system at each time. NaN after the system
+                           merged.
+        event_arr {ndarray} -- A 2D array of the time, SMA and
+                               eccentricity of each system at its
+                               event, NaN if it did not happen.
+    """
+    N, M = t_eval.shape
+
+    a_arr = np.full((N, M), np.nan)
+    e_arr = np.full((N, M), np.nan)
+    event_arr = np.full((N, 3), np.nan)
+
+    for i in prange(N):
+        tolerances = np.array([atol * a0[i], atol])
+
+        _, a, e, event_state = integrate_adaptive(0.0, t_eval[i, -1],
+                                                  a0[i], e0[i], beta[i],
+                                                  rtol, tolerances,
+                                                  t_eval[i],
+                                                  rhs, rhs_params[i],
+                                                  event, event_params[i])
+
+        a_arr[i, :len(a)] = a
+        e_arr[i, :len(e)] = e
+        event_arr[i] = event_state
+
+    return a_arr, e_arr, event_arr
+
+@njit
+def peters_g(e):
+    """
+    The Peters (1964) a(e) relation, up to a constant factor. Accepts
+    scalars or arrays.
+    """
+    return e**(12/19) * (1 + 121/304 * e**2)**(870/2299) / ((1-e) * (1+e))
+
+@njit
+def peters_log_I(e, log_I, log_e):
+    """
+    log(I(e)) for e > 0, from the tabulated Peters integral (see
+    takahe.peters). Below the first grid point I is replaced by its
+    leading-order power law, I = 19/48 e^(48/19), which avoids
+    underflow for tiny e.
+    """
+    log_x = np.log(e)
+
+    if log_x < log_e[0]:
+        return np.log(19/48) + 48/19 * log_x
+
+    return np.interp(log_x, log_e, log_I)
+
+@njit
+def peters_inverse_log_I(target, log_I, log_e):
+    """
+    The eccentricity at which log(I(e)) = target (the inverse of
+    peters_log_I).
+    """
+    if target < log_I[0]:
+        return np.exp(19/48 * (target - np.log(19/48)))
+
+    return np.exp(np.interp(target, log_I, log_e))
+
+@njit
+def map_log_I(e, log_I, log_e):
+    """
+    peters_log_I over a 1D array of eccentricities.
+    """
+    out = np.empty(len(e))
+
+    for i in range(len(e)):
+        out[i] = peters_log_I(e[i], log_I, log_e)
+
+    return out
+
+@njit
+def map_inverse_log_I(target, log_I, log_e):
+    """
+    peters_inverse_log_I over a 1D array of targets.
+    """
+    out = np.empty(len(target))
+
+    for i in range(len(target)):
+        out[i] = peters_inverse_log_I(target[i], log_I, log_e)
+
+    return out
+
+@njit(parallel=True)
+def snapshot_ensemble(times, start, a0, e0, tau, log_I, log_e):
+    """
+    Evaluates the orbits of many systems at a set of common times.
+
+    Uses the self-similar solution of the Peters equations (see
+    takahe.peters.emulate), with the systems distributed over numba's
+    threads.
+
+    Arguments:
+        times {ndarray} -- The times to evaluate the systems at
+        start {ndarray} -- The time each system starts its inspiral at
+                           (in the units of times)
+        a0 {ndarray} -- The initial SMA of each system
+        e0 {ndarray} -- The initial eccentricity of each system
+        tau {ndarray} -- The coalescence time of each system (in the
+                         units of times)
+        log_I {ndarray} -- log(I(e)) on the Peters table
+        log_e {ndarray} -- log(e) on the Peters table
+
+    Returns:
+        a_arr {ndarray} -- A 2D array of the SMA (in the units of a0)
+                           of each system at each time, one row per
+                           time. NaN where the system is not inspiralling.
+        e_arr {ndarray} -- A 2D array of the eccentricity of each
+                           system at each time, one row per time. NaN
+                           where the system is not inspiralling.
+    """
+    M = len(times)
+    N = len(a0)
+
+    a_arr = np.full((M, N), np.nan)
+    e_arr = np.full((M, N), np.nan)
+
+    for i in prange(N):
+        eccentric = e0[i] > 0
+
+        if eccentric:
+            log_I0 = peters_log_I(e0[i], log_I, log_e)
+            log_g0 = np.log(peters_g(e0[i]))
+
+        for j in range(M):
+            dt = times[j] - start[i]
+
+            if dt < 0 or dt >= tau[i]:
+                continue
+
+            remaining = 1 - dt / tau[i]
+
+            if eccentric:
+                e = peters_inverse_log_I(log_I0 + np.log(remaining),
+                                          log_I, log_e)
+                a_arr[j, i] = a0[i] * np.exp(np.log(peters_g(e)) - log_g0)
+                e_arr[j, i] = e
+            else:
+                a_arr[j, i] = a0[i] * remaining**0.25
+                e_arr[j, i] = 0.0
+
+    return a_arr, e_arr
+
+@njit
+def _circularises(t1, a0, e0, beta, e_threshold, a_threshold, rtol, atol,
+                  rhs, rhs_params):
+    """
+    Integrates a single system until its orbit circularises, its SMA
+    falls below a_threshold, or it merges, whichever comes first.
+
+    Arguments:
+        t1 {float} -- An upper bound on the coalescence time (in seconds)
+        a0 {float} -- The initial SMA
+        e0 {float} -- The initial eccentricity
+        beta {float} -- The beta constant of the system
+        e_threshold {float} -- The eccentricity below which the orbit
+                               is circular
+        a_threshold {float} -- The SMA threshold (in the units of a0)
+        rtol {float} -- The relative tolerance
+        atol {ndarray} -- The absolute tolerances for a and e
+        rhs {function} -- The RHS kernel (see peters_rhs())
+        rhs_params {ndarray} -- The parameters of the RHS kernel
+
+    Returns:
+        bool -- True if e falls to e_threshold while a > a_threshold.
+    """
+    t = 0.0
+    yk = np.array([a0, e0])
+    fk = rhs(t, yk, beta, rhs_params)
+
+    h = t1 * 1e-3
+    h_min = t1 * 1e-14
+
+    if yk[0] <= a_threshold:
+        return False
+    elif yk[1] <= e_threshold:
+        return True
+
+    while t < t1 and h > h_min:
+        y5, error, h_next = _try_step(t, yk, fk, h, beta,
+                                      rhs, rhs_params,
+                                      rtol, atol)
+
+        if error > 1:
+            h = h_next
+            continue
+
+        a_crossed = y5[0] <= a_threshold
+        e_crossed = y5[1] <= e_threshold
+
+        if a_crossed and e_crossed:
+            # Both thresholds were crossed within the step, so find
+            # which came first, interpolating linearly.
+            s_a = (yk[0] - a_threshold) / (yk[0] - y5[0])
+            s_e = (yk[1] - e_threshold) / (yk[1] - y5[1])
+
+            return s_e < s_a
+        elif a_crossed:
+            return False
+        elif e_crossed:
+            return True
+
+        t += h
+        yk = y5
+        fk = rhs(t, yk, beta, rhs_params)
+        h = h_next
+
+    return False
+
+@njit(parallel=True)
+def classify_ensemble(t1, a0, e0, beta, e_threshold, a_threshold, rtol, atol,
+                      rhs, rhs_params):
+    """
+    Determines which of many systems circularise, by integrating each
+    only until the outcome is known (see _circularises()), with the
+    systems distributed over numba's threads.
+
+    Arguments:
+        t1 {ndarray} -- An upper bound on the coalescence time of each
+                        system (in seconds)
+        a0 {ndarray} -- The initial SMA of each system
+        e0 {ndarray} -- The initial eccentricity of each system
+        beta {ndarray} -- The beta constant of each system
+        e_threshold {float} -- The eccentricity below which an orbit
+                               is circular
+        a_threshold {float} -- The SMA threshold (in the units of a0)
+        rtol {float} -- The relative tolerance
+        atol {float} -- The absolute tolerance (relative to a0 for
+                        the SMA)
+        rhs {function} -- The RHS kernel (see peters_rhs())
+        rhs_params {ndarray} -- A 2D array of the parameters of the RHS
+                                kernel, one row per system
+
+    Returns:
+        {ndarray} -- A boolean array, True where the system circularises.
+    """
+    N = len(a0)
+    mask = np.zeros(N, dtype=np.bool_)
+
+    for i in prange(N):
+        tolerances = np.array([atol * a0[i], atol])
 
-        yk = yk + 25/216 * k1 + 1408/2565*k3 + 2197/4101 * k4 - 1/5 * k5
+        mask[i] = _circularises(t1[i], a0[i], e0[i], beta[i],
+                                e_threshold, a_threshold, rtol, tolerances,
+                                rhs, rhs_params[i])
 
-    return np.array(a_arr), np.array(e_arr)
+    return mask
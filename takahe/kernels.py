@@ -0,0 +1,100 @@
+"""
+Right-hand-side (RHS) kernels for the orbital evolution integrators.
+
+A kernel is a numba-compiled function rhs(t, y, beta, params) which
+returns the derivative [da/dt, de/dt] of the state y = [a, e] at time
+t (in seconds), for a binary with the given beta constant. Any extra
+constants it needs are passed in the params array. The integrators in
+takahe.helpers are compiled against the kernel they are given, so extra
+physics runs inside the compiled loop rather than calling back into
+Python.
+
+Kernels are registered by name, so that they can be selected with e.g.
+BSS.evolve_until(t_span, kernel='peters+tides', kernel_params=[tau]).
+"""
+import numpy as np
+from numba import njit
+
+from takahe.helpers import peters_rhs
+
+_REGISTRY = {}
+
+def register_kernel(name, kernel):
+    """Registers a kernel under a given name.
+
+    Arguments:
+        name {str} -- The name of the kernel.
+        kernel {function} -- The numba-compiled kernel.
+
+    Raises:
+        TypeError -- If the kernel is not numba-compiled.
+    """
+    if not hasattr(kernel, 'py_func'):
+        raise TypeError("kernel must be compiled with numba.njit!")
+
+    _REGISTRY[name] = kernel
+
+def get_kernel(kernel):
+    """Fetches a kernel.
+
+    Arguments:
+        kernel {str/function} -- The name of a registered kernel, or
+                                 a kernel.
+
+    Returns:
+        {function} -- The kernel.
+
+    Raises:
+        ValueError -- If no kernel is registered under the name.
+        TypeError -- If the kernel is not numba-compiled.
+    """
+    if not isinstance(kernel, str):
+        if not hasattr(kernel, 'py_func'):
+            raise TypeError("kernel must be compiled with numba.njit!")
+
+        return kernel
+
+    if kernel not in _REGISTRY:
+        raise ValueError(f"No kernel named {kernel}! Registered kernels "
+                         f"are: {', '.join(_REGISTRY.keys())}")
+
+    return _REGISTRY[kernel]
+
+def combine(first, second, split):
+    """Combines two kernels into one, by adding their derivatives.
+
+    The parameters of the combined kernel are those of the first kernel
+    followed by those of the second.
+
+    Arguments:
+        first {function} -- The first kernel.
+        second {function} -- The second kernel.
+        split {int} -- The number of parameters of the first kernel.
+
+    Returns:
+        {function} -- The combined kernel.
+    """
+    @njit
+    def combined(t, y, beta, params):
+        return first(t, y, beta, params[:split]) \
+             + second(t, y, beta, params[split:])
+
+    return combined
+
+@njit
+def tidal_circularisation(t, y, beta, params):
+    """Tidal circularisation at constant orbital angular momentum.
+
+    The eccentricity decays exponentially, de/dt = -e / tau, where tau
+    (in seconds) is params[0], while a (1 - e^2) is conserved.
+    """
+    a, e = y[0], y[1]
+
+    dedt = -e / params[0]
+    dadt = 2 * a * e * dedt / ((1-e) * (1+e))
+
+    return np.array([dadt, dedt])
+
+register_kernel('peters', peters_rhs)
+register_kernel('tides', tidal_circularisation)
+register_kernel('peters+tides', combine(peters_rhs, tidal_circularisation, 0))
@@ -1,9 +1,15 @@
+import hashlib
 import linecache
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 import numpy as np
 from hoki import load
 import pandas as pd
 import takahe
+import takahe.cache
 from takahe.constants import *
 
 def from_data(data):
@@ -78,6 +84,258 @@ def from_list(data_list):
 
     return ensemble
 
+def _table_path(fname, name_hints):
+    """Computes the path of the binary copy of a text table.
+
+    The path is keyed on the absolute path, size and modification time
+    of the file, and on the column names, so that editing the file (or
+    reading it with other names) gives a new path.
+
+    Arguments:
+        fname {string} -- the path to the text file.
+        name_hints {list} -- The column names.
+
+    Returns:
+        {string} -- The path to the binary copy (which need not exist).
+    """
+    stat = os.stat(fname)
+    key = "\0".join([os.path.abspath(fname),
+                     str(stat.st_size),
+                     str(stat.st_mtime_ns),
+                     ",".join(name_hints)])
+
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+
+    return os.path.join(takahe.cache.table_dir(),
+                        f"{os.path.basename(fname)}-{digest}.npy")
+
+def _parse_table(fname, name_hints, nrows=None):
+    return pd.read_csv(fname, names=name_hints or None, header=None,
+                       nrows=nrows, sep=r"\s+")
+
+def _save_table(fname, name_hints):
+    """Parses a whole text table and saves its binary copy.
+
+    The least recently used copies are then evicted if the copies are
+    over their size limit (see takahe.cache.configure). Failure to
+    write the copy is not an error.
+
+    Arguments:
+        fname {string} -- the path to the text file.
+        name_hints {list} -- The column names.
+
+    Returns:
+        {recarray} -- The table.
+    """
+    path = _table_path(fname, name_hints)
+    table = _parse_table(fname, name_hints).to_records(index=False)
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write atomically, in case another process reads it.
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.save(f, table)
+        os.replace(tmp, path)
+    except OSError:
+        return table
+
+    takahe.cache.evict_tables()
+
+    return table
+
+def cache_table(fname, name_hints=[]):
+    """Saves a binary copy of a text table, unless it already has one.
+
+    Later reads of the file (see read_table) memory-map the copy
+    instead of parsing the text again. Nothing is saved while the
+    cache is disabled (see takahe.cache.configure).
+
+    Arguments:
+        fname {string} -- the path to the text file.
+
+    Keyword Arguments:
+        name_hints {list} -- A list of column names for pandas.
+                             (default: {[]})
+    """
+    name_hints = list(name_hints or [])
+
+    if not takahe.cache.enabled():
+        return
+
+    if not os.path.exists(_table_path(fname, name_hints)):
+        _save_table(fname, name_hints)
+
+def read_table(fname, name_hints=[], nrows=None, cache=True):
+    """Reads a whitespace-delimited table, such as a BPASS file.
+
+    If the file has a binary (structured .npy) copy in the cache (see
+    takahe.cache.table_dir), it is memory-mapped instead of parsing
+    the text again, so only the rows requested are read from disk. The
+    copy is saved the first time the whole file is read, or by
+    cache_table(); reading only the first nrows rows of a file without
+    a copy parses just those rows. Nothing is read from or written to
+    the cache while it is disabled (see takahe.cache.configure).
+
+    Arguments:
+        fname {string} -- the path to the file we wish to open.
+
+    Keyword Arguments:
+        name_hints {list} -- A list of column names for pandas. If empty,
+                             the columns are numbered. (default: {[]})
+        nrows {int} -- The number of rows to read. Set to None to read
+                       the whole file. (default: {None})
+        cache {bool} -- Whether to use (and create) the binary copy.
+                        (default: {True})
+
+    Returns:
+        {DataFrame} -- The first nrows rows of the table.
+    """
+    name_hints = list(name_hints or [])
+
+    if not cache or not takahe.cache.enabled():
+        return _parse_table(fname, name_hints, nrows)
+
+    path = _table_path(fname, name_hints)
+
+    try:
+        table = np.load(path, mmap_mode='r')
+        takahe.cache.mark_used(path)
+    except (OSError, ValueError):
+        if nrows is not None:
+            return _parse_table(fname, name_hints, nrows)
+
+        table = _save_table(fname, name_hints)
+
+    df = pd.DataFrame(np.asarray(table[:nrows]))
+
+    if not name_hints:
+        df.columns = range(len(df.columns))
+
+    return df
+
+def _columns_from_table(df, mass):
+    """Converts a table of systems into ensemble columns.
+
+    Vectorised counterpart to from_data followed by
+    BinaryStarSystemEnsemble.add: the units are converted and beta
+    computed as in BinaryStarSystem, missing weights, ages and
+    coalescence times are given the same defaults, and every system
+    has a multiplicity of ceil(weight*mass).
+
+    Arguments:
+        df {DataFrame} -- The table, with (at least) m1, m2, a0 and e0
+                          columns, in Solar units.
+        mass {number} -- The total mass of the ensemble.
+
+    Returns:
+        {dict} -- The columns, for BinaryStarSystemEnsemble.add_columns.
+
+    Raises:
+        KeyError -- if a required column is missing.
+        ValueError -- if an eccentricity is not in the interval [0, 1].
+    """
+    def column(key, default=None):
+        if key in df:
+            return df[key].to_numpy(dtype=np.float64)
+        elif default is None:
+            raise KeyError(f"The table has no {key} column!")
+
+        return np.full(len(df), default, dtype=np.float64)
+
+    e0 = column('e0')
+
+    if np.any((e0 > 1) | (e0 < 0)):
+        raise ValueError("Eccentricity must be between 0 and 1.")
+
+    m1 = column('m1') * Solar_Mass
+    m2 = column('m2') * Solar_Mass
+    a0 = column('a0') * Solar_Radii * 1000
+    beta = (64/5) * (G**3*m1*m2*(m1+m2)) / (c**5)
+
+    columns = {
+        'm1': m1,
+        'm2': m2,
+        'a0': a0,
+        'e0': e0,
+        'beta': beta,
+        'weight': column('weight', 1),
+        'evolution_age': column('evolution_age', 0),
+        'rejuvenation_age': column('rejuvenation_age', 0)
+    }
+
+    if 'coalescence_time' in df:
+        columns['coalescence_time'] = column('coalescence_time')
+    else:
+        columns['coalescence_time'] = takahe.peters.coalescence_time(a0,
+                                                                     e0,
+                                                                     beta)
+
+    columns['multiplicity'] = np.ceil(columns['weight'] * mass)
+
+    return columns
+
+def _iter_frames(fname, name_hints, chunk_size, nrows=None):
+    """Reads a table chunk_size rows at a time (see iter_chunks).
+
+    Arguments:
+        fname {string} -- the path to the file we wish to open.
+        name_hints {list} -- A list of column names for pandas.
+        chunk_size {int} -- The number of rows per chunk.
+
+    Keyword Arguments:
+        nrows {int} -- The number of rows to read. Set to None to read
+                       the whole file. (default: {None})
+
+    Yields:
+        {DataFrame} -- The next chunk_size rows (or fewer, at the end).
+    """
+    name_hints = list(name_hints or [])
+    path = _table_path(fname, name_hints)
+
+    if takahe.cache.enabled() and os.path.exists(path):
+        takahe.cache.mark_used(path)
+        table = np.load(path, mmap_mode='r')[:nrows]
+
+        for i in range(0, len(table), chunk_size):
+            yield pd.DataFrame(np.asarray(table[i:i+chunk_size]))
+    else:
+        yield from pd.read_csv(fname, names=name_hints or None, header=None,
+                               nrows=nrows, sep=r"\s+", chunksize=chunk_size)
+
+def iter_chunks(fname, name_hints=[], chunk_size=100000, mass=1e6):
+    """
+    Loads a file as a sequence of ensembles, chunk_size rows at a time.
+
+    Only one chunk is held in memory at a time, so that whole BPASS
+    files can be processed in bounded memory (see
+    takahe.ensemble.accumulate). If the file has a binary copy (see
+    read_table) it is memory-mapped, and otherwise the text is parsed
+    a chunk at a time.
+
+    Arguments:
+        fname {string} -- the path to the file we wish to open.
+
+    Keyword Arguments:
+        name_hints {list} -- A list of column names for pandas.
+                             (default: {[]})
+        chunk_size {int} -- The number of rows per chunk.
+                            (default: {100000})
+        mass {number} -- The total mass of the ensemble. Each row is
+                         given a multiplicity of ceil(weight*mass).
+                         (default: {1e6})
+
+    Yields:
+        {BinaryStarSystemEnsemble} -- An ensemble of the next chunk_size
+                                      rows (or fewer, at the end).
+    """
+    for df in _iter_frames(fname, name_hints, chunk_size):
+        ensemble = takahe.ensemble.create()
+        ensemble.add_columns(_columns_from_table(df, mass))
+
+        yield ensemble
+
 def from_file(fname, name_hints=[], n_stars=100, mass=1e6):
     """
     Loads the first n_stars in a given file into a pandas dataframe.
@@ -96,6 +354,11 @@ def from_file(fname, name_hints=[], n_stars=100, mass=1e6):
         mass {number} -- The total mass of the ensemble. This is used to
                          populate the ensemble with weight*mass stars of
                          a given stellar configuration (default: {1e6})
+
+    Returns:
+        {BinaryStarSystemEnsemble} -- An ensemble with one entry per
+                                      row, each with a multiplicity of
+                                      ceil(weight*mass).
     """
 
     # If we request all stars, set n_stars to None
@@ -103,15 +366,11 @@ def from_file(fname, name_hints=[], n_stars=100, mass=1e6):
     if n_stars == 'all':
         n_stars = None
 
-    # Read the file into a dataframe
+    # Read the file into a dataframe (see read_table)
     # Sample file format is:
     # m1   m2   a0    e0    weight   evolution_age   rejuvenation_age   coalescence_time
     # Note that the number of spaces can vary
-    df = pd.read_csv(fname,
-                     names=name_hints,
-                     nrows=n_stars,
-                     sep=r"\s+",
-                     engine='python')
+    df = read_table(fname, name_hints=name_hints, nrows=n_stars)
 
     # initialize an ensemble (glorified list)
     ensemble = takahe.ensemble.create()
@@ -120,10 +379,8 @@ def from_file(fname, name_hints=[], n_stars=100, mass=1e6):
         # weight represents the number of stars of this kind per 10^6 solar masses.
         number_of_stars_of_type = int(np.ceil(row[1]['weight'] * mass))
 
-        # generate this many stars
-        for n in range(number_of_stars_of_type):
-            star = from_data(dict(row[1])) # create the BSS object
-            ensemble.add(star) # add to ensemble -- O(1) operation
+        star = from_data(dict(row[1])) # create the BSS object
+        ensemble.add(star, number_of_stars_of_type) # O(1) operation
 
     return ensemble
 
@@ -131,8 +388,9 @@ def from_file_efficient(fname, name_hints=[], n_stars=100, mass=1e6):
     """Load an ensemble from a file. Does so more efficiently than
     from_file.
 
-    This method will soon replace from_file (when it is proved correct).
-    Generally performs 95-97% faster than from_file.
+    Unlike from_file, stops loading once the systems loaded add up
+    to the given mass. The rows are converted to the columns of the
+    ensemble in bulk, without constructing BinaryStarSystem objects.
 
     Arguments:
         fname {string} -- the path to the file we wish to open.
@@ -140,53 +398,53 @@ def from_file_efficient(fname, name_hints=[], n_stars=100, mass=1e6):
     Keyword Arguments:
         name_hints {list} -- A list of column names for pandas.
                              (default: {[]})
-        n_stars {number} -- The number of stars (rows in file) to load
-                            (default: {100})
+        n_stars {number} -- The maximum number of stars (rows in file)
+                            to load, or "all". (default: {100})
         mass {number} -- The total mass of the ensemble. This is used to
                          populate the ensemble with weight*mass stars of
                          a given stellar configuration (default: {1e6})
 
     Returns:
-        [type] -- [description]
+        {BinaryStarSystemEnsemble} -- An ensemble with one entry per
+                                      row, each with a multiplicity of
+                                      ceil(weight*mass).
     """
     if n_stars == "all":
         n_stars = None
 
-    current_mass = 0
-
     ensemble = takahe.ensemble.create()
 
-    df = pd.read_csv(fname,
-                     names=name_hints,
-                     nrows=n_stars,
-                     sep=r"\s+",
-                     engine='python')
-
-    i = 0
-
-    while current_mass < mass:
-        if i >= n_stars:
-            break
-
-        row = df.iloc[i].to_dict()
-        number_of_stars_of_type = int(np.ceil(row['weight'] * mass))
-
-        star = from_data(row)
+    df = read_table(fname, name_hints=name_hints, nrows=n_stars)
+    columns = _columns_from_table(df, mass)
 
-        for j in range(number_of_stars_of_type):
-            ensemble.add(star)
+    # Rows are taken in order until the mass they represent reaches
+    # the mass budget (including the row which reaches it).
+    row_mass = columns['multiplicity'] * (df['m1'] + df['m2']).to_numpy()
+    n_rows = np.searchsorted(np.cumsum(row_mass), mass, side='left') + 1
 
-        current_mass += (star.get_mass() * number_of_stars_of_type)
+    if mass <= 0:
+        n_rows = 0
 
-        i += 1
+    ensemble.add_columns({key: value[:n_rows]
+                          for key, value in columns.items()})
 
     return ensemble
 
 
-def random_from_file(fname, draw_from, name_hints=[], n_stars=100, mass=1e6):
+def random_from_file(fname, draw_from, name_hints=[], n_stars=100, mass=1e6,
+                     seed=None, weighted=False, chunk_size=100000):
     """
     Loads a random sample of stars from a file.
 
+    The sample is drawn without replacement, in a single streaming
+    pass over the file (or its binary copy, see read_table), so only
+    chunk_size rows and the n_stars rows sampled so far are held in
+    memory. Every row is given a random key, exponentially distributed
+    and divided by the weight of the row if weighted is True, and the
+    n_stars rows with the smallest keys are kept (i.e. the
+    Efraimidis-Spirakis A-ES algorithm, which is a uniform reservoir
+    sample when unweighted).
+
     Arguments:
         fname {string} -- The path to the file you want to load
         draw_from {int} -- How many lines of the file to sample from. For
@@ -194,7 +452,8 @@ def random_from_file(fname, draw_from, name_hints=[], n_stars=100, mass=1e6):
                                                       10,
                                                       n_stars=7)
                            means "uniformly draw 7 stars from the first
-                           10 lines of the file somefile.dat."
+                           10 lines of the file somefile.dat". Set to
+                           None to draw from the whole file.
 
     Keword Arguments:
         name_hints {list} -- A list of hints for each column name for
@@ -207,26 +466,283 @@ def random_from_file(fname, draw_from, name_hints=[], n_stars=100, mass=1e6):
                          takahe accounts for the weight (number of systems
                          of this type per 10^6 solar masses).
         mass {float} -- The total mass to create.
+        seed {int/Generator} -- The seed of the random number generator,
+                                or the generator itself, for
+                                numpy.random.default_rng. Set to None
+                                to seed it from the OS. (default: {None})
+        weighted {bool} -- Whether to sample rows with probability
+                           proportional to their weight.
+                           (default: {False})
+        chunk_size {int} -- The number of rows read at a time.
+                            (default: {100000})
 
     Returns:
         {BinaryStarSystemEnsemble} -- An ensemble object representing
                                       the ensemble of objects,
+
+    Raises:
+        ValueError -- if fewer than n_stars lines are drawn from.
     """
+    rng = np.random.default_rng(seed)
+
+    sample = None
+    keys = np.empty(0)
+
+    for df in _iter_frames(fname, name_hints, chunk_size, nrows=draw_from):
+        chunk_keys = rng.standard_exponential(len(df))
+
+        if weighted:
+            with np.errstate(divide='ignore'):
+                chunk_keys = chunk_keys / df['weight'].to_numpy()
+
+        if sample is not None:
+            df = pd.concat([sample, df], ignore_index=True)
+            chunk_keys = np.concatenate([keys, chunk_keys])
+
+        # Keep the n_stars rows with the smallest keys.
+        if len(df) > n_stars:
+            keep = np.argpartition(chunk_keys, n_stars)[:n_stars]
+            df = df.iloc[keep].reset_index(drop=True)
+            chunk_keys = chunk_keys[keep]
+
+        sample, keys = df, chunk_keys
+
+    if sample is None or len(sample) < n_stars:
+        raise ValueError("Cannot sample more stars than are drawn from!")
+
+    sample = sample.iloc[np.argsort(keys, kind='stable')]
 
     ensemble = takahe.ensemble.create()
+    ensemble.add_columns(_columns_from_table(sample, mass))
+
+    return ensemble
+
+def metallicity_from_filename(fname):
+    """Extracts the metallicity from the name of a BPASS file.
+
+    For instance, Remnant-Birth-bin-imf135_300-z020_StandardJJ.dat has
+    a metallicity of "020".
+
+    Arguments:
+        fname {string} -- The path to the file.
+
+    Returns:
+        {string} -- The metallicity term, or None if there is none.
+    """
+    fname = fname.split("/")[-1].split(".")[0].rsplit("_", 1)[0]
+    parts = fname.split("-")
+    z = None
+
+    for part in parts:
+        if part and part[0] == "z":
+            # metallicity term in fname
+            if "_" in part:
+                part = part.split("_")[0]
+            z = part[1:]
+
+    return z
+
+def infer_name_hints(fname, name_hints=None):
+    """Infers the column names of a BPASS file from its name.
+
+    If the file uses the StandardJJ prescription, then the columns are
+    assumed to be the 7 StandardJJ columns (unless name_hints are
+    given), and if the filename has _ct in it, the final column is
+    assumed to be the coalescence time of each system.
+
+    Arguments:
+        fname {string} -- The path to the file.
+
+    Keyword Arguments:
+        name_hints {list} -- Column names which take precedence over
+                             the StandardJJ ones. (default: {None})
+
+    Returns:
+        {list} -- The column names.
+    """
+    if name_hints is None and "StandardJJ" in fname:
+        # Provide column names for the StandardJJ prescription
+        name_hints = ['m1','m2','a0','e0']
+        name_hints.extend(['weight','evolution_age','rejuvenation_age'])
+
+    name_hints = list(name_hints or [])
 
-    df = pd.read_csv(fname,
-                     nrows=draw_from,
-                     names=name_hints,
-                     sep=r'\s+',
-                     engine='python')
+    if "_ct" in fname:
+        # If the filename containts _ct, then we have a file
+        # for which the coalescence times have already been computed
+        name_hints.append("coalescence_time")
 
-    sample = df.sample(n_stars)
+    return name_hints
 
-    for star_line in sample.iterrows():
-        star_line = star_line[1] # pandas returns a tuple from iterrows()
-        for n in range(int(np.ceil(star_line['weight'] * mass))):
-            binary_star = from_data(star_line)
-            ensemble.add(binary_star)
+def _create_shared_memory(size):
+    """Creates a shared memory block for the parent process to free.
+
+    The parent process takes ownership of the block, and unlinks it
+    (see _from_shared_memory and _free_shared_memory). Where
+    SharedMemory supports it (Python 3.13+), the block is not tracked
+    at all. Otherwise the worker's registration is left alone: spawned
+    workers share the parent's resource tracker, and unlinking the
+    block in the parent unregisters it there.
+
+    Arguments:
+        size {int} -- The size of the block (in bytes).
+
+    Returns:
+        {SharedMemory} -- The block.
+    """
+    try:
+        return shared_memory.SharedMemory(create=True, size=size,
+                                          track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(create=True, size=size)
+
+def _load_into_shared_memory(fname, name_hints, n_stars, mass):
+    """Loads a file, and copies the ensemble columns to shared memory.
+
+    Runs in the worker processes of from_directory.
+
+    Returns:
+        {tuple} -- A 2-tuple of the name of the shared memory block,
+                   which holds a (len(_STORED_COLUMNS), N) array of
+                   float64s, and N.
+    """
+    ensemble = from_file_efficient(fname,
+                                   name_hints=name_hints,
+                                   n_stars=n_stars,
+                                   mass=mass)
+
+    keys = takahe.ensemble._STORED_COLUMNS
+    n = len(ensemble)
+
+    block = _create_shared_memory(max(len(keys) * n * 8, 1))
+
+    columns = np.ndarray((len(keys), n), dtype=np.float64, buffer=block.buf)
+
+    for i, key in enumerate(keys):
+        columns[i] = ensemble.column(key)
+
+    del columns
+    block.close()
+
+    return block.name, n
+
+def _from_shared_memory(name, n):
+    """Builds an ensemble from columns in shared memory, and frees it.
+
+    Arguments:
+        name {str} -- The name of the shared memory block.
+        n {int} -- The number of systems.
+
+    Returns:
+        {BinaryStarSystemEnsemble} -- The ensemble.
+    """
+    keys = takahe.ensemble._STORED_COLUMNS
+    block = shared_memory.SharedMemory(name=name)
+
+    try:
+        columns = np.ndarray((len(keys), n), dtype=np.float64,
+                             buffer=block.buf)
+
+        ensemble = takahe.ensemble.create()
+        ensemble.add_columns(dict(zip(keys, columns)))
+
+        del columns
+    finally:
+        block.close()
+        block.unlink()
 
     return ensemble
+
+def _free_shared_memory(name):
+    """Frees a shared memory block, if it still exists.
+
+    Arguments:
+        name {str} -- The name of the shared memory block.
+    """
+    try:
+        block = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+
+    block.close()
+    block.unlink()
+
+def from_directory(path, workers=None, name_hints=None, n_stars=1000,
+                   mass=1e6):
+    """Loads every BPASS file in a directory, one ensemble per metallicity.
+
+    The files are loaded concurrently in a pool of worker processes,
+    each as Universe.populate would (with from_file_efficient). The
+    workers hand the columns of each ensemble back through shared
+    memory, rather than by pickling them. Files without a metallicity
+    in their name (see metallicity_from_filename) are skipped.
+
+    The workers are spawned, and so import the __main__ module of the
+    calling program: scripts which call this function with more than
+    one worker must do so under an if __name__ == "__main__": guard.
+
+    Arguments:
+        path {string} -- The path to the directory.
+
+    Keyword Arguments:
+        workers {int} -- The number of worker processes. Set to None to
+                         use one per CPU, and to 1 to load the files in
+                         this process. (default: {None})
+        name_hints {list} -- Column names for every file; see
+                             infer_name_hints. (default: {None})
+        n_stars {number} -- The maximum number of stars (rows) to load
+                            from each file, or "all". (default: {1000})
+        mass {number} -- The total mass of each ensemble.
+                         (default: {1e6})
+
+    Returns:
+        {dict} -- The ensembles, keyed by metallicity (e.g. "020").
+
+    Raises:
+        ValueError -- If two files have the same metallicity.
+    """
+    files = {}
+
+    for entry in sorted(os.listdir(path)):
+        fname = os.path.join(path, entry)
+        z = metallicity_from_filename(entry)
+
+        if z is None or not os.path.isfile(fname):
+            continue
+        elif z in files:
+            raise ValueError(f"Multiple files have metallicity {z}!")
+
+        files[z] = fname
+
+    jobs = {z: (fname, infer_name_hints(fname, name_hints), n_stars, mass)
+            for z, fname in files.items()}
+
+    if workers == 1:
+        return {z: from_file_efficient(fname,
+                                       name_hints=hints,
+                                       n_stars=n_stars,
+                                       mass=mass)
+                for z, (fname, hints, n_stars, mass) in jobs.items()}
+
+    # Forking is unsafe once numba's thread pool is running, so the
+    # workers are spawned.
+    context = multiprocessing.get_context('spawn')
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=context) as pool:
+        futures = {z: pool.submit(_load_into_shared_memory, *job)
+                   for z, job in jobs.items()}
+
+    # Every worker has finished. The blocks they handed back are only
+    # freed here, so they must be freed even if another worker failed.
+    blocks = {z: future.result() for z, future in futures.items()
+              if future.exception() is None}
+
+    try:
+        for future in futures.values():
+            future.result()
+
+        return {z: _from_shared_memory(*blocks.pop(z)) for z in futures}
+    finally:
+        for name, _ in blocks.values():
+            _free_shared_memory(name)
@@ -1,15 +1,22 @@
+import os
 import pickle
+from functools import lru_cache, partial
 
 import numpy as np
-import matplotlib.pyplot as plt
 import takahe
-from kea.hist import histogram, BPASS_hist
 from takahe.constants import *
-from scipy.optimize import root_scalar, fminbound
-from scipy.integrate import quad
-from numba import njit
-
-def create(model, hubble_parameter=70):
+from scipy.optimize import root_scalar
+from scipy.integrate import quad, cumulative_trapezoid
+from scipy.signal import convolve, fftconvolve
+from scipy.special import gammainc, hyp2f1
+from numba import vectorize
+
+# The SFRD peak parameter of Madau & Dickinson 2014 (see
+# Universe.stellar_formation_rate).
+_DEFAULT_U = 5.6
+
+def create(model, hubble_parameter=70, tolerance=1e-8, omega_m=None,
+           omega_lambda=None):
     """
 
     "if you want to make an apple pie from scratch,
@@ -19,7 +26,7 @@ def create(model, hubble_parameter=70):
     important physical parameters.
 
     """
-    return Universe(model, hubble_parameter)
+    return Universe(model, hubble_parameter, tolerance, omega_m, omega_lambda)
 
 """
 Internal functions.
@@ -28,22 +35,66 @@ These functions are defined here such that we can numba-fy them to make
 them computationally faster.
 """
 
-def _format_z(z):
+def _metallicity_value(z):
+    """Converts a BPASS metallicity term (e.g. "020", "em4") to a float."""
     if z[:2] == "em":
-        div = 1*10**(-int(z[-1]))
-    else:
-        div = float("0." + z)
-    res = div / 0.020
+        return 1*10**(-int(z[-1]))
+
+    return float("0." + z)
+
+def _format_z(z):
+    res = _metallicity_value(z) / 0.020
     return rf"{res}Z_\odot"
 
-@njit
+def _langer_norman(Z, z, Z_sun=0.020, alpha=-1.16, beta=2):
+    """The fraction of star formation below metallicity Z at redshift z.
+
+    Uses eqn(4) of Langer & Norman 2006 [1], in which the metallicity
+    of star-forming gas is drawn from a Schechter-like distribution
+    whose mean declines with redshift as 10^(-0.15 z) Z_sun.
+
+    [1] https://arxiv.org/abs/astro-ph/0512271
+
+    Arguments:
+        Z {float/ndarray} -- The metallicity (as a mass fraction).
+        z {float/ndarray} -- The redshift.
+
+    Keyword Arguments:
+        Z_sun {float} -- The solar metallicity (default: 0.020)
+        alpha {float} -- The slope of the galaxy mass function
+                         (default: -1.16)
+        beta {float} -- The slope of the mass-metallicity relation
+                        (default: 2)
+
+    Returns:
+        {float/ndarray} -- The fraction of star formation at
+                           metallicities below Z.
+    """
+    return gammainc(alpha + 2, (Z/Z_sun)**beta * 10**(0.15*beta*z))
+
+def _metallicity_bin_edges(Z):
+    """Splits the metallicity axis between a sorted set of metallicities.
+
+    Each metallicity stands for all star formation between the
+    geometric means with its neighbours; the lowest and highest take
+    everything below and above them respectively.
+
+    Arguments:
+        Z {ndarray} -- The metallicities, in ascending order.
+
+    Returns:
+        {ndarray} -- len(Z) + 1 bin edges, from 0 to infinity.
+    """
+    return np.concatenate([[0], np.sqrt(Z[1:] * Z[:-1]), [np.inf]])
+
+@vectorize(['float64(float64, float64, float64)'])
 def _comoving_vol(DH, omega_k, DC):
     if omega_k > 0:
         OK = np.sqrt(omega_k)
         DM = DH / OK * np.sinh(OK * DC / DH)
     elif omega_k == 0:
         DM = DC
-    elif omega_k < 0:
+    else:
         OK = np.sqrt(np.abs(omega_k))
         DM = DH / OK * np.sin(OK * DC / DH)
 
@@ -65,6 +116,291 @@ def _comoving_vol(DH, omega_k, DC):
 
     return VC
 
+def _convolve_dtd(dtd, dtd_edges, SFRD, edges):
+    """Convolves a delay-time distribution with a star formation history.
+
+    For each lookback-time bin j, sums over the bins i >= j in which
+    stars formed the fraction of the DTD which falls in bin j:
+
+        events[j] = sum_i SFRD[i] * int_{e[i+1] - e[j+1]}^{e[i+1] - e[j]} DTD
+
+    where the DTD is taken to be constant within each of its bins. If
+    both distributions share the same evenly spaced edges this is a
+    discrete convolution. Otherwise, the overlap integrals are
+    tabulated from the cumulative DTD and contracted with the SFRD.
+
+    Several DTDs and star formation histories may be convolved at once
+    by stacking them along leading axes (which broadcast against one
+    another); the convolution is always along the last axis.
+
+    Arguments:
+        dtd {ndarray} -- The delay-time distribution, per unit time.
+        dtd_edges {ndarray} -- The bin edges of the DTD.
+        SFRD {ndarray} -- The star formation in each bin of edges.
+        edges {ndarray} -- The bin edges of the result.
+
+    Returns:
+        {ndarray} -- The (unnormalised) events in each bin of edges.
+    """
+    dtd = np.asarray(dtd, dtype=np.float64)
+    SFRD = np.asarray(SFRD, dtype=np.float64)
+    widths = np.diff(edges)
+
+    if np.array_equal(dtd_edges, edges) and np.allclose(widths, widths[0]):
+        N = len(widths)
+
+        if dtd.ndim == 1 and SFRD.ndim == 1:
+            events = convolve(SFRD[::-1], dtd * widths[0], method='auto')
+        else:
+            dtd, SFRD = np.broadcast_arrays(dtd, SFRD)
+            events = fftconvolve(SFRD[..., ::-1], dtd * widths[0], axes=-1)
+
+        return events[..., :N][..., ::-1]
+
+    cumulative = np.cumsum(dtd * np.diff(dtd_edges), axis=-1)
+    cumulative = np.concatenate([np.zeros(cumulative.shape[:-1] + (1,)),
+                                 cumulative], axis=-1)
+
+    # The delays are the same for every DTD, so the interpolation
+    # weights are found once and shared between them.
+    delays = edges[1:, None] - edges[None, :]
+
+    upper = np.clip(np.searchsorted(dtd_edges, delays, side='right'),
+                    1, len(dtd_edges) - 1)
+    lower = upper - 1
+
+    weights = (delays - dtd_edges[lower]) / np.diff(dtd_edges)[lower]
+    weights = np.clip(weights, 0, 1)
+
+    integrals = cumulative[..., lower] * (1-weights) \
+              + cumulative[..., upper] * weights
+    integrals = np.where(delays < dtd_edges[0], 0, integrals)
+
+    overlaps = integrals[..., :-1] - integrals[..., 1:]
+
+    return np.einsum('...i,...ij->...j', SFRD, overlaps)
+
+def _delay_time_distribution(populace, edges):
+    """Computes the delay-time distribution of a populace over edges.
+
+    The result is cached by the contents of the populace (see
+    takahe.cache), so it is reused by every universe it populates.
+
+    Arguments:
+        populace {BinaryStarSystemEnsemble} -- The populace.
+        edges {ndarray} -- The lookback-time bin edges (in gigayears).
+
+    Returns:
+        {ndarray} -- The delay-time distribution in each bin.
+    """
+    key = takahe.cache.key('delay_time_distribution', populace.digest(),
+                           edges)
+
+    return takahe.cache.cached(key,
+                               lambda: populace.delay_time_distribution(edges)[0])
+
+def _bin_contents(values, edges, x):
+    """Looks up the contents of the bins containing x.
+
+    Points outside of the edges take the contents of the nearest bin.
+
+    Arguments:
+        values {ndarray} -- The contents of each bin.
+        edges {ndarray} -- The bin edges.
+        x {float/ndarray} -- The point(s) to look up.
+
+    Returns:
+        {float/ndarray} -- The contents of the bin containing each point.
+    """
+    i = np.searchsorted(edges, x, side='right') - 1
+
+    return values[np.clip(i, 0, len(values) - 1)][()]
+
+# Gauss-Legendre nodes and weights used by _integrate_in_redshift.
+_GL_NODES, _GL_WEIGHTS = np.polynomial.legendre.leggauss(32)
+
+def _integrate_in_redshift(f, z_low, z_high):
+    """Integrates f(z) over many redshift intervals at once.
+
+    Uses fixed-order Gauss-Legendre quadrature in ln(1+z), in which the
+    SFRD is smooth even over wide high-redshift intervals.
+
+    Arguments:
+        f {callable} -- A vectorised function of redshift.
+        z_low {ndarray} -- The lower limits of integration.
+        z_high {ndarray} -- The upper limits of integration.
+
+    Returns:
+        {ndarray} -- The integral over each interval.
+    """
+    x_low = np.log1p(z_low)[..., None]
+    x_high = np.log1p(z_high)[..., None]
+
+    half_width = (x_high - x_low) / 2
+    x = x_low + half_width * (_GL_NODES + 1)
+    z = np.expm1(x)
+
+    return np.sum(_GL_WEIGHTS * f(z) * (1+z) * half_width, axis=-1)
+
+# Largest redshift covered by the distance tables.
+_Z_MAX = 1000
+
+@lru_cache(maxsize=None)
+def _distance_table(omega_m, omega_lambda, tolerance):
+    """Tabulates the dimensionless lookback time and comoving distance.
+
+    Cumulatively integrates 1/((1+z)E(z)) and 1/E(z) over z -- i.e. the
+    lookback time in units of the Hubble time and the comoving distance
+    in units of the Hubble distance -- with the trapezium rule, on a
+    grid evenly spaced in x = ln(1+z) between z = 0 and z = _Z_MAX. The
+    grid is refined until the estimated error of both is below
+    tolerance.
+
+    The error bound is the sum of the Richardson estimate of the
+    integration error (from the grid at half the resolution) and the
+    bound h^2/8 max|T''| on the error of interpolating linearly
+    between grid points.
+
+    As the table is dimensionless, it is shared by every Universe with
+    the same density parameters (whatever H0 is), and built only once.
+
+    Arguments:
+        omega_m {float} -- The matter density parameter.
+        omega_lambda {float} -- The dark energy density parameter.
+        tolerance {float} -- The maximum permitted error (in units of
+                             the Hubble time).
+
+    Returns:
+        {tuple} -- A 4-tuple of the x = ln(1+z) grid, the dimensionless
+                   lookback time and comoving distance at each grid
+                   point, and the error bound.
+    """
+    omega_k = 1 - omega_m - omega_lambda
+
+    def E(z):
+        return np.sqrt(omega_m * (1+z)**3
+                     + omega_k * (1+z)**2
+                     + omega_lambda)
+
+    def table(n):
+        x = np.linspace(0, np.log1p(_Z_MAX), n + 1)
+        z = np.expm1(x)
+
+        # dz = (1+z) dx
+        integrands = np.array([1 / E(z), (1+z) / E(z)])
+
+        return x, cumulative_trapezoid(integrands, x, initial=0)
+
+    n = 1024
+    _, coarse = table(n)
+
+    while True:
+        x, fine = table(2*n)
+
+        integration_error = np.max(np.abs(fine[:, ::2] - coarse)) / 3
+        interpolation_error = np.max(np.abs(np.diff(fine, 2))) / 8
+        error = integration_error + interpolation_error
+
+        if error <= tolerance or n >= 2**22:
+            return x, fine[0], fine[1], error
+
+        n *= 2
+        coarse = fine
+
+"""
+Closed-form distances.
+
+For Einstein-de Sitter, open matter-only and flat Lambda-CDM universes,
+the lookback time (in units of the Hubble time) and the comoving
+distance (in units of the Hubble distance) are known analytically, and
+in some cases so are their inverses. _closed_forms collects whichever
+are available for a given cosmology.
+"""
+
+def _eds_lookback(z):
+    return 2/3 * (1 - (1+z)**-1.5)
+
+def _eds_redshift_at_lookback(T):
+    return (1 - 3/2 * T)**(-2/3) - 1
+
+def _eds_comoving(z):
+    return 2 * (1 - 1/np.sqrt(1+z))
+
+def _eds_redshift_at_comoving(D):
+    return (1 - D/2)**-2 - 1
+
+def _open_lookback(z, omega_m):
+    def age(z):
+        return np.sqrt(1 + omega_m*z) / ((1-omega_m) * (1+z)) \
+             - omega_m / (2 * (1-omega_m)**1.5) \
+             * np.arccosh((omega_m*z - omega_m + 2) / (omega_m * (1+z)))
+
+    return age(0) - age(z)
+
+def _open_comoving(z, omega_m):
+    # Mattig's relation gives the transverse comoving distance D_M,
+    # from which D_C follows by inverting eqn(16) of Hogg (1999).
+    OK = np.sqrt(1 - omega_m)
+    DM = 2 * (2 - omega_m*(1-z) - (2-omega_m) * np.sqrt(1 + omega_m*z)) \
+       / (omega_m**2 * (1+z))
+
+    return np.arcsinh(OK * DM) / OK
+
+def _flat_lookback(z, omega_m, omega_lambda):
+    def age(z):
+        return 2 / (3 * np.sqrt(omega_lambda)) \
+             * np.arcsinh(np.sqrt(omega_lambda/omega_m) * (1+z)**-1.5)
+
+    return age(0) - age(z)
+
+def _flat_redshift_at_lookback(T, omega_m, omega_lambda):
+    age = _flat_lookback(np.inf, omega_m, omega_lambda) - T
+    x = np.sinh(3/2 * np.sqrt(omega_lambda) * age) \
+      / np.sqrt(omega_lambda/omega_m)
+
+    return x**(-2/3) - 1
+
+def _flat_comoving(z, omega_m, omega_lambda):
+    # int dx / sqrt(1 + a x^3) = x 2F1(1/3, 1/2; 4/3; -a x^3)
+    def F(x):
+        return x * hyp2f1(1/3, 1/2, 4/3, -omega_m/omega_lambda * x**3)
+
+    return (F(1+z) - F(1)) / np.sqrt(omega_lambda)
+
+def _closed_forms(omega_m, omega_lambda):
+    """Collects the closed-form distances available for a cosmology.
+
+    Arguments:
+        omega_m {float} -- The matter density parameter.
+        omega_lambda {float} -- The dark energy density parameter.
+
+    Returns:
+        {dict} -- Maps any of 'lookback', 'redshift_at_lookback',
+                  'comoving' and 'redshift_at_comoving' to a vectorised
+                  function of a single (dimensionless) argument. Empty
+                  if the cosmology has no closed forms.
+    """
+    # Only accept cosmologies which are one of these up to round-off.
+    isclose = lambda a, b: np.abs(a - b) < 1e-12
+
+    if isclose(omega_m, 1) and isclose(omega_lambda, 0):
+        return {'lookback': _eds_lookback,
+                'redshift_at_lookback': _eds_redshift_at_lookback,
+                'comoving': _eds_comoving,
+                'redshift_at_comoving': _eds_redshift_at_comoving}
+    elif isclose(omega_lambda, 0) and 0 < omega_m < 1:
+        return {'lookback': partial(_open_lookback, omega_m=omega_m),
+                'comoving': partial(_open_comoving, omega_m=omega_m)}
+    elif isclose(omega_m + omega_lambda, 1) \
+         and omega_m > 0 and omega_lambda > 0:
+        args = {'omega_m': omega_m, 'omega_lambda': omega_lambda}
+        return {'lookback': partial(_flat_lookback, **args),
+                'redshift_at_lookback': partial(_flat_redshift_at_lookback,
+                                                **args),
+                'comoving': partial(_flat_comoving, **args)}
+
+    return {}
+
 """
 Begin definition of Universe class.
 """
@@ -79,7 +415,8 @@ class Universe:
     important physical parameters.
 
     """
-    def __init__(self, model, hubble_parameter=70):
+    def __init__(self, model, hubble_parameter=70, tolerance=1e-8,
+                 omega_m=None, omega_lambda=None):
         """
 
         Creates our Universe, conforming to a given set of physical laws.
@@ -89,17 +426,30 @@ class Universe:
         as possible)
 
         Arguments:
-            model {str} -- the model (eds, lowdensity, highlambda, real)
-                           of the universe under consideration.
+            model {str} -- the model (eds, lowdensity, highlambda, real
+                           or custom) of the universe under
+                           consideration. A custom universe takes its
+                           density parameters from omega_m and
+                           omega_lambda.
 
         Keyword Arguments:
             hubble_parameter {float} -- the current value of H0.
                                         units are km/s/Mpc.
                                         (default: 70)
+            tolerance {float} -- the error permitted in the tabulated
+                                 cosmological distances, relative to
+                                 the Hubble time. (default: 1e-8)
+            omega_m {float} -- the matter density parameter of a
+                               custom universe. (default: None)
+            omega_lambda {float} -- the dark energy density parameter
+                                    of a custom universe.
+                                    (default: None)
 
         Raises:
             ValueError -- if model is not eds / lowdensity /
-                                          highlambda / real
+                                          highlambda / real / custom,
+                          or a custom model is missing its density
+                          parameters.
         """
 
         if model.lower() == 'eds':
@@ -115,6 +465,11 @@ class Universe:
             Omega_M = 0.286
             Omega_Lambda = 0.714
             hubble_parameter = 69.6
+        elif model.lower() == 'custom':
+            if omega_m is None or omega_lambda is None:
+                raise ValueError("A custom model needs omega_m and omega_lambda!")
+            Omega_M = omega_m
+            Omega_Lambda = omega_lambda
         else:
             raise ValueError("Incorrect model type!")
 
@@ -128,10 +483,18 @@ class Universe:
 
         self.tH = 1 / (self.H0 / 3.086e+19 * 31557600000000000) # Gyr
 
+        self.tolerance = tolerance
+
+        # Analytic distances, where this cosmology admits them. Anything
+        # not in here is interpolated from _distance_table.
+        self.__closed_forms = _closed_forms(self.omega_m, self.omega_lambda)
+
         self.__resolution = 51
 
         self.__count = 0
         self.__z = None
+        self.__populations = {}
+        self.__event_rates = {}
 
     def comoving_volume(self, z=None, d=None):
         """Computes the comoving volume, all-sky, out to redshift z.
@@ -151,26 +514,27 @@ class Universe:
         / highlambda).
 
         This function is a wrapper for an internal Numba-compiled
-        function.
+        ufunc, and so accepts arrays of z or d.
 
         [1] https://arxiv.org/pdf/astro-ph/9905116.pdf
 
         Keyword Arguments:
-            z {float} -- The redshift to compute V_C for
-                         (default: {None})
-            d {float} -- The comoving distance to compute V_C for
-                         (default: {None})
+            z {float/ndarray} -- The redshift to compute V_C for
+                                 (default: {None})
+            d {float/ndarray} -- The comoving distance to compute V_C
+                                 for (default: {None})
 
         Returns:
-            float -- The comoving volume element in units of Mpc^3
+            float/ndarray -- The comoving volume element in units of
+                             Mpc^3
 
         Raises:
             ValueError -- If one of z or d are missing
         """
 
-        if z == None and d == None:
+        if z is None and d is None:
             raise ValueError("Either z or d must be provided!")
-        elif z == None:
+        elif z is None:
             DC = d
         else:
             DC = self.compute_comoving_distance(z)
@@ -180,27 +544,83 @@ class Universe:
     def set_nbins(self, resolution):
         if isinstance(resolution, int):
             self.__resolution = resolution
+            self.__event_rates = {}
         else:
             raise TypeError("The supplied resolution is not an int!")
 
+    def get_nbins(self):
+        return self.__resolution
+
+    def get_bin_edges(self):
+        """Fetches the edges of the linear time bins of this universe.
+
+        Returns:
+            {ndarray} -- self.get_nbins() + 1 evenly spaced edges between
+                         0 and the Hubble time (in gigayears).
+        """
+        return np.linspace(0, self.tH, self.__resolution + 1)
+
     def events_at(self, tL):
-        events = self.event_rate()
+        """Looks up the event rate at given lookback times.
 
-        i = events.getBin(tL)
-        return events.getBinContent(i)
+        Reads the bins of the (memoised) event rate of self.event_rate()
+        containing each lookback time.
+
+        Arguments:
+            tL {float/ndarray} -- The lookback time(s) (in gigayears).
+
+        Returns:
+            {float/ndarray} -- The event rate at each lookback time.
+        """
+        rate, edges = self.__cached('rate', self.event_rate_distribution)
+
+        return _bin_contents(rate, edges, tL)
 
     def events_at_BPASS(self, tL):
-        events = self.event_rate_BPASS()
+        """Looks up the event rate over the BPASS bins at given lookback times.
+
+        As self.events_at, but reading the histogram of
+        self.event_rate_BPASS().
+
+        Arguments:
+            tL {float/ndarray} -- The lookback time(s) (in gigayears).
+
+        Returns:
+            {float/ndarray} -- The event rate at each lookback time.
+        """
+        _, rate, edges = self.__cached('BPASS', self.__event_rate_BPASS)
+
+        return _bin_contents(rate, edges, tL)
+
+    def __cached(self, kind, compute):
+        """Internal function to memoise an event rate.
+
+        The result of compute() is kept until the populace is replaced
+        or added to, or the resolution or cosmology change.
+
+        Arguments:
+            kind {str} -- The name to memoise the result under.
+            compute {callable} -- The function computing the result.
+
+        Returns:
+            The result of compute().
+        """
+        key = (self.populace.version(), self.__resolution) + self.__cosmology()
+        entry = self.__event_rates.get(kind)
+
+        if entry is None or entry[0] is not self.populace or entry[1] != key:
+            entry = (self.populace, key, compute())
+            self.__event_rates[kind] = entry
 
-        i = events.getBin(tL)
-        return events.getBinContent(i)
+        return entry[2]
 
     def compute_delay_time_distribution(self, *argv, **kwargs):
         """Generates the event rate plot for this ensemble.
 
         Computes the instantaneous delay-time distribution for this
-        ensemble. Returns the histogram generated, however the histogram
-        is saved internally in Kea as a matplotlib plot.
+        ensemble, in self.get_nbins() linear bins between 0 and the
+        Hubble time. Returns the histogram generated, which Kea can
+        render as a matplotlib plot.
 
         Thus, given an ensemble called ens, one may use
 
@@ -209,8 +629,8 @@ class Universe:
 
         to render it.
 
-        Note that the binning is logarithmic so bin size does vary
-        across the plot.
+        The DTD itself is computed by
+        BinaryStarSystemEnsemble.delay_time_distribution().
 
         Thanks to Max Briel (https://github.com/maxbriel/) for his
         assistance in writing this function.
@@ -218,23 +638,15 @@ class Universe:
         Returns:
             hist -- the (kea-generated) histogram object.
         """
+        from kea.hist import histogram
 
         hist = histogram(0, self.tH, self.__resolution)
-        culmulative_merge_rate = 0
-        edges = hist.getBinEdges()
-        bin_widths = np.array([])
+        edges = self.get_bin_edges()
 
-        NBins = self.__resolution
+        dtd, edges = self.populace.delay_time_distribution(edges)
 
-        for i in range(0, NBins-1):
-            merge_rate_up_to_bin = self.populace.merge_rate(edges[i+1], return_as='abs')
-            merge_rate_in_bin = merge_rate_up_to_bin - culmulative_merge_rate
-            hist.Fill(edges[i], w=merge_rate_in_bin)
-            culmulative_merge_rate += merge_rate_in_bin
-            bin_widths = np.append(bin_widths, hist.getBinWidth(i))
-
-        # Normalisation
-        hist = hist / 1e6 / bin_widths
+        for i in range(self.__resolution):
+            hist.Fill(edges[i], w=dtd[i])
 
         return hist
 
@@ -244,52 +656,230 @@ class Universe:
     def event_rate_BPASS(self, pickle_results=False):
         """Generates and plots the event rate distribution for this universe.
 
-        Computes the event rate distribution for this universe. Assumes
-        SFRD as given by eqn(15) in Madau & Dickinson 2014 [1], with
-        u = 5.6 (see self.stellar_formation_rate for details).
+        Computes the event rate distribution for this universe, over the
+        BPASS time bins. Assumes SFRD as given by eqn(15) in Madau &
+        Dickinson 2014 [1], with u = 5.6 (see
+        self.stellar_formation_rate for details).
 
         Returns the given histogram for further manipulation, if required.
+        The histogram is memoised (see self.events_at_BPASS), so repeated
+        calls return the same histogram until the populace, resolution
+        or cosmology change.
 
         [1] https://www.annualreviews.org?cid=75#/doi/pdf/10.1146/annurev-astro-081811-125615
 
+        Keyword Arguments:
+            pickle_results {bool} -- Whether to pickle the delay-time
+                                     distribution and event rate
+                                     histograms to output/pickles.
+                                     (default: {False})
+
         Returns:
             {kea.hist.histogram} -- the generated histogram.
         """
+        events = self.__cached('BPASS', self.__event_rate_BPASS)[0]
 
-        dtd_hist = self.populace.legacy_compute_delay_time_distribution()
-        NBins = dtd_hist.getNBins()
-        edges = dtd_hist.getBinEdges()
+        if pickle_results:
+            dtd_hist = self.populace.legacy_compute_delay_time_distribution()
+            self.__pickle_results("BPASS", dtd_hist, events)
+
+        return events
+
+    def __event_rate_BPASS(self):
+        """Internal function to compute the event rate over the BPASS bins.
+
+        Returns:
+            {tuple} -- A 3-tuple of the histogram of self.event_rate_BPASS,
+                       the event rate in each bin and the bin edges.
+        """
+        from kea.hist import BPASS_hist
 
         events = BPASS_hist()
-        ev_edges = events.getLinEdges()
-        bins = np.array([])
+        edges = np.asarray(events.getLinEdges()[:events.getNBins()+1])
+
+        rate, _ = self.event_rate_distribution(edges)
+        rate /= 1e9 # Normalise to years
+
+        for i in range(len(rate)):
+            events.Fill(edges[i], rate[i], ty='lin')
+
+        return events, rate, edges
 
-        for i in range(1, NBins+1):
-            t1 = ev_edges[i-1]
-            t2 = ev_edges[i]
+    def event_rate_distribution(self, edges=None):
+        """Computes the event rate distribution for this universe.
 
-            z_low = self.__lookback_to_redshift(t1)
-            z_high = self.__lookback_to_redshift(t2)
+        Array-based counterpart to self.event_rate(): the delay-time
+        distribution of the populace is convolved with the SFRD (see
+        self.event_rate() for the assumptions made) in a single pass.
+        On evenly spaced edges this is a discrete convolution (carried
+        out by FFT when that is faster); otherwise the overlap of every
+        pair of bins is tabulated and the convolution is a matrix
+        product.
 
-            SFRD, _ = quad(self.stellar_formation_rate, z_low, z_high)
+        The result is cached by the contents of the populace, the
+        cosmology and the edges (see takahe.cache).
 
-            SFRD /= (1e-3)**3
+        Keyword Arguments:
+            edges {ndarray} -- The lookback-time bin edges (in
+                               gigayears). Set to None to use the
+                               linear bins of self.get_bin_edges().
+                               (default: {None})
 
-            for j in range(i):
-                t1_prime = t2 - ev_edges[j]
-                t2_prime = t2 - ev_edges[j+1]
-                events_in_bin = dtd_hist.integral(t2_prime, t1_prime)
-                events.Fill(ev_edges[j], events_in_bin*SFRD, ty='lin')
+        Returns:
+            {tuple} -- A 2-tuple of the event rate in each bin and the
+                       bin edges used.
+        """
+        if edges is None:
+            edges = self.get_bin_edges()
 
-            bins = np.append(bins, events.getBinWidth(i-1)*1e9)
+        edges = np.asarray(edges, dtype=np.float64)
 
-        events /= bins # Normalise to years
+        def compute():
+            dtd = _delay_time_distribution(self.populace, edges)
+            SFRD = self.__star_formation_in_bins(edges, u=_DEFAULT_U)
 
-        filename_syntax = f"output/pickles/BPASS_{self.__z}_"
-        pickle.dump(dtd_hist, open(filename_syntax + "dtd.pickle", 'wb'))
-        pickle.dump(events, open(filename_syntax + "evs.pickle", 'wb'))
+            rate = _convolve_dtd(dtd, edges, SFRD, edges)
+            return rate / np.diff(edges) # Normalise to years
 
-        return events
+        key = takahe.cache.key('event_rate', self.populace.digest(),
+                               self.__cosmology(), _DEFAULT_U, edges)
+
+        return takahe.cache.cached(key, compute), edges
+
+    def event_rate_sweep(self, u=_DEFAULT_U, models=None, edges=None):
+        """Computes the event rate over a grid of SFRD and cosmologies.
+
+        The delay-time distribution of the populace is computed once.
+        For each cosmology, the SFRD in every bin is then integrated for
+        all values of u at once (see self.stellar_formation_rate), and
+        every event rate is found in one batched convolution (see
+        self.event_rate_distribution).
+
+        Keyword Arguments:
+            u {float/ndarray} -- The SFRD peak parameter(s).
+                                 (default: 5.6)
+            models {list} -- The cosmologies to consider, either as
+                             Universes or as model names to pass to
+                             create(). Set to None to use only this
+                             universe. (default: {None})
+            edges {ndarray} -- The lookback-time bin edges (in
+                               gigayears), shared by every cosmology.
+                               Set to None to use the linear bins of
+                               self.get_bin_edges(). (default: {None})
+
+        Returns:
+            {tuple} -- A 2-tuple of the event rates, with one row for
+                       each (model, u) pair in the order
+                       [(models[0], u[0]), (models[0], u[1]), ...],
+                       and the bin edges used.
+        """
+        if models is None:
+            models = [self]
+
+        if edges is None:
+            edges = self.get_bin_edges()
+
+        universes = [create(model) if isinstance(model, str) else model
+                     for model in models]
+
+        edges = np.asarray(edges, dtype=np.float64)
+        u = np.atleast_1d(np.asarray(u, dtype=np.float64))
+
+        dtd = _delay_time_distribution(self.populace, edges)
+
+        # One row of SFRD weights per (model, u) pair; u broadcasts
+        # against the quadrature nodes in each bin.
+        SFRD = [universe.__star_formation_in_bins(edges, u[:, None, None])
+                for universe in universes]
+
+        rates = _convolve_dtd(dtd, edges, np.concatenate(SFRD), edges)
+        rates /= np.diff(edges) # Normalise to years
+
+        return rates, edges
+
+    def populate_metallicities(self, populations, **kwargs):
+        """Populates the Universe with stars of several metallicities.
+
+        Arguments:
+            populations {dict/str} -- a dict mapping BPASS metallicity
+                                      terms (e.g. "020", "em4") to
+                                      ensembles, or the path to a
+                                      directory to load them from with
+                                      takahe.load.from_directory.
+
+        Keyword Arguments:
+            Passed to takahe.load.from_directory if populations is a path.
+        """
+        if isinstance(populations, str):
+            populations = takahe.load.from_directory(populations, **kwargs)
+
+        order = sorted(populations, key=_metallicity_value)
+        self.__populations = {z: populations[z] for z in order}
+        self.__event_rates = {}
+
+    def get_metallicities(self):
+        return list(self.__populations.keys())
+
+    def event_rate_by_metallicity(self, edges=None, metallicity_cdf=None,
+                                  u=_DEFAULT_U):
+        """Computes the event rate of a universe of many metallicities.
+
+        The SFRD (see self.stellar_formation_rate) is split between the
+        populations given to self.populate_metallicities according to
+        the fraction of star formation at each metallicity at each
+        redshift. Each population stands for the star formation between
+        the geometric means of its metallicity and those of its
+        neighbours (see _metallicity_bin_edges). The delay-time
+        distributions of every population are then convolved with their
+        share of the SFRD in one batched convolution (see
+        self.event_rate_distribution).
+
+        Keyword Arguments:
+            edges {ndarray} -- The lookback-time bin edges (in
+                               gigayears). Set to None to use the
+                               linear bins of self.get_bin_edges().
+                               (default: {None})
+            metallicity_cdf {callable} -- A function of metallicity Z
+                                          and redshift z returning the
+                                          fraction of star formation
+                                          below Z. Set to None to use
+                                          Langer & Norman 2006.
+                                          (default: {None})
+            u {float} -- The SFRD peak parameter (default: 5.6)
+
+        Returns:
+            {tuple} -- A 3-tuple of the total event rate in each bin,
+                       a dict of the event rate at each metallicity,
+                       and the bin edges used.
+
+        Raises:
+            ValueError -- If the universe has no metallicity-resolved
+                          populations.
+        """
+        if not self.__populations:
+            raise ValueError("No populations! Use populate_metallicities first.")
+
+        if edges is None:
+            edges = self.get_bin_edges()
+
+        if metallicity_cdf is None:
+            metallicity_cdf = _langer_norman
+
+        edges = np.asarray(edges, dtype=np.float64)
+
+        metallicities = self.get_metallicities()
+        Z = np.array([_metallicity_value(z) for z in metallicities])
+        Z_edges = _metallicity_bin_edges(Z)
+
+        dtd = np.array([_delay_time_distribution(self.__populations[z], edges)
+                        for z in metallicities])
+        SFRD = self.__star_formation_by_metallicity(edges, Z_edges,
+                                                    metallicity_cdf, u)
+
+        rates = _convolve_dtd(dtd, edges, SFRD, edges)
+        rates /= np.diff(edges) # Normalise to years
+
+        return rates.sum(axis=0), dict(zip(metallicities, rates)), edges
 
     def event_rate(self, pickle_results=False):
         """Generates and plots the event rate distribution for this universe.
@@ -299,104 +889,240 @@ class Universe:
         u = 5.6 (see self.stellar_formation_rate for details).
 
         Returns the given histogram for further manipulation, if required.
+        The computation itself is done by self.event_rate_distribution(),
+        and the histogram is memoised (see self.events_at), so repeated
+        calls return the same histogram until the populace, resolution
+        or cosmology change.
 
         [1] https://www.annualreviews.org?cid=75#/doi/pdf/10.1146/annurev-astro-081811-125615
 
+        Keyword Arguments:
+            pickle_results {bool} -- Whether to pickle the delay-time
+                                     distribution and event rate
+                                     histograms to output/pickles.
+                                     (default: {False})
+
         Returns:
             {kea.hist.histogram} -- the generated histogram.
         """
+        events, _, edges = self.__cached('linear', self.__event_rate)
+
+        if pickle_results:
+            from kea.hist import histogram
+
+            dtd_hist = histogram(0, self.tH, self.__resolution)
+            dtd = _delay_time_distribution(self.populace, edges)
+
+            for i in range(self.__resolution):
+                dtd_hist.Fill(edges[i], w=dtd[i])
 
-        dtd_hist = histogram(0, self.tH, self.__resolution)
-        edges = dtd_hist.getBinEdges()
+            self.__pickle_results("linear", dtd_hist, events)
+
+        return events
+
+    def __event_rate(self):
+        """Internal function to compute the event rate over the linear bins.
+
+        Returns:
+            {tuple} -- A 3-tuple of the histogram of self.event_rate, the
+                       event rate in each bin and the bin edges.
+        """
+        from kea.hist import histogram
 
         events = histogram(0, self.tH, self.__resolution)
-        ev_edges = events.getBinEdges()
-        bins = np.array([])
 
-        culmulative_merge_rate = 0
-        dtd_bin_widths = np.array([])
+        rate, edges = self.__cached('rate', self.event_rate_distribution)
 
-        NBins = self.__resolution
+        for i in range(self.__resolution):
+            events.Fill(edges[i], rate[i])
 
-        for i in range(1, self.__resolution+1):
-            merge_rate_up_to_bin = self.populace.merge_rate(edges[i], return_as='abs')
-            width = dtd_hist.getBinWidth(i-1)
-            merge_rate_in_bin = merge_rate_up_to_bin - culmulative_merge_rate
-            normalised_mr = merge_rate_in_bin / 1e6 / width
+        return events, rate, edges
 
-            dtd_hist.Fill(edges[i-1], w=normalised_mr)
-            culmulative_merge_rate += merge_rate_in_bin
+    def __pickle_results(self, prefix, dtd_hist, events):
+        """Internal function to pickle the histograms of an event rate.
 
-            t1 = ev_edges[i-1]
-            t2 = ev_edges[i]
+        Arguments:
+            prefix {str} -- The type of binning ("linear" or "BPASS").
+            dtd_hist {kea.hist.histogram} -- The delay-time distribution.
+            events {kea.hist.histogram} -- The event rate.
+        """
+        os.makedirs("output/pickles", exist_ok=True)
+        filename_syntax = f"output/pickles/{prefix}_{self.__z}_"
 
-            z_low = self.__lookback_to_redshift(t1)
-            z_high = self.__lookback_to_redshift(t2)
+        with open(filename_syntax + "dtd.pickle", 'wb') as f:
+            pickle.dump(dtd_hist, f)
+        with open(filename_syntax + "evs.pickle", 'wb') as f:
+            pickle.dump(events, f)
 
-            SFRD, _ = quad(self.stellar_formation_rate, z_low, z_high)
+    def __cosmology(self):
+        """Internal function to collect the parameters of this cosmology.
 
-            SFRD /= (1e-3)**3
+        Returns:
+            {tuple} -- H0, the density parameters and the tolerance.
+        """
+        return (self.H0, self.omega_m, self.omega_lambda, self.tolerance)
 
-            for j in range(i):
-                t1_prime = t2 - ev_edges[j]
-                t2_prime = t2 - ev_edges[j+1]
-                events_in_bin = dtd_hist.integral(t2_prime, t1_prime) * 1e9
-                events.Fill(ev_edges[j], events_in_bin*SFRD)
+    def __star_formation_in_bins(self, edges, u=_DEFAULT_U):
+        """Internal function to integrate the SFRD over lookback-time bins.
 
-            bins = np.append(bins, events.getBinWidth(i-1)*1e9)
+        Integrates self.stellar_formation_rate over redshift between the
+        redshifts of consecutive edges, in units of M_sun / yr / Gpc^3.
 
-        events /= bins # Normalise to years
+        Arguments:
+            edges {ndarray} -- The lookback-time bin edges (in gigayears)
 
-        filename_syntax = f"output/pickles/linear_{self.__z}_"
-        pickle.dump(dtd_hist, open(filename_syntax + "dtd.pickle", 'wb'))
-        pickle.dump(events, open(filename_syntax + "evs.pickle", 'wb'))
+        Keyword Arguments:
+            u {float/ndarray} -- The SFRD peak parameter. An array of
+                                 shape (n, 1, 1) gives one row of
+                                 results per value. (default: 5.6)
 
-        return events
+        Returns:
+            {ndarray} -- The integrated SFRD, one entry per bin.
+        """
+        z = self.__lookback_to_redshift(edges)
+
+        SFRD = _integrate_in_redshift(lambda z: self.stellar_formation_rate(z=z, u=u),
+                                      z[:-1],
+                                      z[1:])
+
+        return SFRD / (1e-3)**3
+
+    def __star_formation_by_metallicity(self, edges, Z_edges, cdf,
+                                        u=_DEFAULT_U):
+        """Internal function to split the SFRD in bins between metallicities.
+
+        As self.__star_formation_in_bins, but weighting the SFRD by the
+        fraction of star formation between consecutive Z_edges.
+
+        Arguments:
+            edges {ndarray} -- The lookback-time bin edges (in gigayears)
+            Z_edges {ndarray} -- The metallicity bin edges.
+            cdf {callable} -- The fraction of star formation below a
+                              metallicity, as a function of (Z, z).
+
+        Keyword Arguments:
+            u {float} -- The SFRD peak parameter (default: 5.6)
+
+        Returns:
+            {ndarray} -- The integrated SFRD, one row per metallicity
+                         bin and one column per lookback-time bin.
+        """
+        z = self.__lookback_to_redshift(edges)
+        Z_edges = Z_edges[:, None, None]
+
+        def SFRD(z):
+            fractions = np.diff(cdf(Z_edges, z), axis=0)
+            return self.stellar_formation_rate(z=z, u=u) * fractions
+
+        return _integrate_in_redshift(SFRD, z[:-1], z[1:]) / (1e-3)**3
 
     def __lookback_to_redshift(self, tL):
         """Internal function to convert a lookback time into a redshift.
 
         Used by plot_merge_rate in furtherance of computing the SFRD.
 
+        Uses the closed-form inverse where this cosmology has one, and
+        otherwise inverts the tabulated lookback time (see
+        _distance_table), so that the lookback time of the redshift
+        returned is within self.lookback_error() of tL. Lookback times
+        beyond z = 1000 are mapped to z = 1000.
+
         Arguments:
-            tL {float} -- A lookback time within the range (0, 14).
+            tL {float/ndarray} -- A lookback time within the range
+                                  (0, 14).
 
         Returns:
-            {float} -- The redshift z, corresponding to the lookback time
-                       tL
+            {float/ndarray} -- The redshift z, corresponding to the
+                               lookback time tL
         """
+        if 'redshift_at_lookback' in self.__closed_forms:
+            forms = self.__closed_forms
+            T = np.minimum(np.asarray(tL) / self.tH,
+                           forms['lookback'](_Z_MAX))
 
-        f = lambda z: np.abs(self.__redshift_to_lookback(z) - tL)
+            return forms['redshift_at_lookback'](T)[()]
 
-        zbest, _, _, _ = fminbound(f, 1e-8, 1000, maxfun=500, full_output=1, xtol=1e-8)
+        x, lookback, _, _ = self.__distance_table()
 
-        return zbest
+        return np.expm1(np.interp(tL, self.tH * lookback, x))
 
     def __redshift_to_lookback(self, z):
         """Internal function to convert a redshift into a lookback time.
 
         Used by plot_merge_rate in furtherance of computing the SFRD.
 
+        Uses the closed-form lookback time where this cosmology has
+        one. Otherwise interpolates the tabulated lookback time (see
+        _distance_table) for redshifts up to 1000, to within
+        self.lookback_error(), and integrates numerically beyond that.
+
         Arguments:
-            z {float} -- A redshift value in the range (0, 100).
+            z {float/ndarray} -- A redshift value in the range (0, 100).
 
         Returns:
-            {float} -- The redshift z, corresponding to the lookback time
-                       tL
+            {float/ndarray} -- The lookback time tL (in gigayears),
+                               corresponding to the redshift z
         """
+        if 'lookback' in self.__closed_forms:
+            return self.tH * self.__closed_forms['lookback'](np.asarray(z, dtype=np.float64))[()]
 
-        def integrand(z):
-            def E(z):
-                return np.sqrt(self.omega_m * (1+z)**3
-                             + self.omega_k * (1+z)**2
-                             + self.omega_lambda)
-            return 1 / ((1+z) * E(z))
+        x, lookback, _, _ = self.__distance_table()
 
-        rest, err = quad(integrand, 0, z)
+        tL = self.tH * np.interp(np.log1p(z), x, lookback)
 
-        return self.tH*rest
+        if np.any(np.asarray(z) > _Z_MAX):
+            integrand = lambda z: 1 / ((1+z) * self.__E(z))
+            integrate = np.vectorize(lambda z: self.tH * quad(integrand, 0, z)[0])
+            tL = np.where(np.asarray(z) > _Z_MAX, integrate(z), tL)[()]
 
-    def stellar_formation_rate(self, z=None, d=None, u=5.6):
+        return tL
+
+    def __distance_table(self):
+        """Internal function to fetch the distance table of this universe.
+
+        Returns:
+            {tuple} -- See _distance_table.
+        """
+        return _distance_table(self.omega_m, self.omega_lambda, self.tolerance)
+
+    def __E(self, z):
+        """Internal function to compute E(z) = H(z)/H0, eqn(14) of [1].
+
+        [1] https://arxiv.org/pdf/astro-ph/9905116.pdf
+        """
+        return np.sqrt(self.omega_m * (1+z)**3
+                     + self.omega_k * (1+z)**2
+                     + self.omega_lambda)
+
+    def lookback_error(self):
+        """Bounds the error of the tabulated lookback times.
+
+        Returns:
+            {float} -- The maximum error in lookback time (in gigayears)
+                       made when converting between lookback time and
+                       redshift. Zero if both conversions are done in
+                       closed form.
+        """
+        if {'lookback', 'redshift_at_lookback'} <= set(self.__closed_forms):
+            return 0.0
+
+        return self.tH * self.__distance_table()[3]
+
+    def comoving_distance_error(self):
+        """Bounds the error of the tabulated comoving distances.
+
+        Returns:
+            {float} -- The maximum error in comoving distance (in Mpc)
+                       made when converting between comoving distance
+                       and redshift. Zero if both conversions are done
+                       in closed form.
+        """
+        if {'comoving', 'redshift_at_comoving'} <= set(self.__closed_forms):
+            return 0.0
+
+        return self.DH * self.__distance_table()[3]
+
+    def stellar_formation_rate(self, z=None, d=None, u=_DEFAULT_U):
         """Computes the SFRD for the universe at a given redshift.
 
         Uses eqn(15) of [1] to compute the SFRD at redshift z. You may
@@ -426,9 +1152,9 @@ class Universe:
         Raises:
             ValueError -- If z or d are not provided.
         """
-        if z == None and d == None:
+        if z is None and d is None:
             raise ValueError("Either z or d must be provided!")
-        elif z == None:
+        elif z is None:
             z = self.compute_redshift(d)
 
         SFRD = 0.015 * (1+z)**2.7 / (1+((1+z)/2.9)**u)
@@ -438,52 +1164,81 @@ class Universe:
     def compute_redshift(self, d):
         """Computes the redshift at a given comoving distance d.
 
-        Uses scipy.optimize.root_scalar to find the redshift, via
-        eqn(15) and eqn(14) of [1].
+        Uses the closed-form inverse where this cosmology has one, and
+        otherwise inverts the tabulated comoving distance of this
+        universe (see self.compute_comoving_distance), so that the
+        comoving distance at the redshift returned is within
+        self.comoving_distance_error() of d.
 
+        Beyond the table (z > 1000) this falls back on
+        scipy.optimize.root_scalar, via eqn(15) and eqn(14) of [1].
         Note that as this involves finding a root of a function that
-        must be continually numerically evaluated, this function can be
-        both unstable and computationally expensive.
+        must be continually numerically evaluated, this can be both
+        unstable and computationally expensive.
 
         [1] https://arxiv.org/pdf/astro-ph/9905116.pdf
 
         Arguments:
-            d {float} -- The comoving distance to compute redshift at.
-                         (units: Mpc)
+            d {float/ndarray} -- The comoving distance to compute
+                                 redshift at. (units: Mpc)
 
         Returns:
-            float -- The redshift at distance d.
+            float/ndarray -- The redshift at distance d.
         """
-        f = lambda x: self.compute_comoving_distance(x) - d
-        res = root_scalar(f, x0=0, x1=0.001)
+        if 'redshift_at_comoving' in self.__closed_forms:
+            D = np.asarray(d, dtype=np.float64) / self.DH
+            return self.__closed_forms['redshift_at_comoving'](D)[()]
+
+        x, _, comoving, _ = self.__distance_table()
+
+        z = np.expm1(np.interp(d, self.DH * comoving, x))
+
+        beyond = np.asarray(d) > self.DH * comoving[-1]
 
-        return res.root
+        if np.any(beyond):
+            def root(d):
+                f = lambda x: self.compute_comoving_distance(x) - d
+                return root_scalar(f, x0=_Z_MAX, x1=2*_Z_MAX).root
+
+            z = np.where(beyond, np.vectorize(root)(d), z)[()]
+
+        return z
 
     def compute_comoving_distance(self, z):
         """Computes the comoving distance between two objects in this
         universe.
 
-        Uses eqn(15) and eqn(14) from [1], and numerically integrates
-        this using scipy.integrate.quad.
+        Uses eqn(15) and eqn(14) from [1], in closed form where this
+        cosmology has one. Otherwise these are integrated cumulatively
+        over a grid in redshift once per cosmology (see
+        _distance_table) and interpolated, to within
+        self.comoving_distance_error(). Beyond the table (z > 1000) this
+        integrates numerically using scipy.integrate.quad.
 
         [1] https://arxiv.org/pdf/astro-ph/9905116.pdf
 
         Arguments:
-            z {float} -- The redshift to compute DC for.
+            z {float/ndarray} -- The redshift to compute DC for.
 
         Returns:
-            number -- The comoving radial distance (units: Mpc)
+            number/ndarray -- The comoving radial distance (units: Mpc)
         """
-        def integrand(z):
-            return 1 / np.sqrt(self.omega_m * (1+z)**3
-                             + self.omega_k * (1+z)**2
-                             + self.omega_lambda)
+        if 'comoving' in self.__closed_forms:
+            return self.DH * self.__closed_forms['comoving'](np.asarray(z, dtype=np.float64))[()]
+
+        x, _, comoving, _ = self.__distance_table()
+
+        DC = self.DH * np.interp(np.log1p(z), x, comoving)
 
-        result, err = quad(integrand, 0, z)
+        if np.any(np.asarray(z) > _Z_MAX):
+            integrand = lambda z: 1 / self.__E(z)
+            integrate = np.vectorize(lambda z: self.DH * quad(integrand, 0, z)[0])
+            DC = np.where(np.asarray(z) > _Z_MAX, integrate(z), DC)[()]
 
-        return self.DH * result
+        return DC
 
-    def populate(self, loader, mass=1e6, name_hints=None, n_stars=1000, load_type='linear'):
+    def populate(self, loader, mass=1e6, name_hints=None, n_stars=1000,
+                 load_type='linear', seed=None):
         """
         Populates the Universe with stars.
 
@@ -502,17 +1257,15 @@ class Universe:
                             each star type in the dataset.
             name_hints {list} -- a list of column names to pass to the
                                  loader.
+            n_stars {int} -- the number of lines to load.
+            load_type {str} -- "linear" to load the first n_stars lines,
+                               or "random" to draw n_stars of the first
+                               10 * n_stars lines at random.
+            seed {int/Generator} -- the seed for the random draw (see
+                                    takahe.load.random_from_file).
         """
 
-        if name_hints == None and "StandardJJ" in loader:
-            # Provide column names for the StandardJJ prescription
-            name_hints = ['m1','m2','a0','e0']
-            name_hints.extend(['weight','evolution_age','rejuvenation_age'])
-
-        if "_ct" in loader:
-            # If the filename containts _ct, then we have a file
-            # for which the coalescence times have already been computed
-            name_hints.append("coalescence_time")
+        name_hints = takahe.load.infer_name_hints(loader, name_hints)
 
         # Do we load the first n_stars lines, or a random sample of
         # n_stars lines?
@@ -528,16 +1281,9 @@ class Universe:
                                                          10 * n_stars,
                                                          name_hints=name_hints,
                                                          mass=mass,
-                                                         n_stars=n_stars)
+                                                         n_stars=n_stars,
+                                                         seed=seed)
 
         # Extract the metallicity from the filename
-        fname = loader.split("/")[-1].split(".")[0].rsplit("_", 1)[0]
-        parts = fname.split("-")
-        self.__z = None
-
-        for part in parts:
-            if part[0] == "z":
-                # metallicity term in fname
-                if "_" in part:
-                    part = part.split("_")[0]
-                self.__z = part[1:]
+        self.__z = takahe.load.metallicity_from_filename(loader)
+        self.__event_rates = {}
@@ -0,0 +1,7 @@
+import pytest
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path_factory, monkeypatch):
+    # Keep everything takahe caches out of the home directory.
+    cache = tmp_path_factory.getbasetemp() / "cache"
+    monkeypatch.setenv("TAKAHE_CACHE_DIR", str(cache))
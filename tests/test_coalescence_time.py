@@ -12,3 +12,21 @@ def test_ct():
     BSS = takahe.load.from_data(data=cfg)
 
     assert np.isclose(BSS.get('coalescence_time'), 2.734, atol=1e-1)
+
+def test_exact_ct():
+    ensemble = takahe.load.from_list([
+        {'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.0},
+        {'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274},
+        {'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.9}])
+
+    exact = ensemble.coalescence_times(mode='exact')
+    approx = ensemble.coalescence_times(mode='approx')
+
+    assert np.isclose(exact[0], approx[0])
+    assert np.allclose(exact, approx, rtol=0.1)
+    assert np.isclose(ensemble[1].coalescence_time(mode='exact'), exact[1])
+
+    # The merger found by integrating the Peters equations.
+    t, a, e = ensemble[2].evolve_until((0, 2 * exact[2] * 31557600000000000),
+                                       method='adaptive')
+    assert np.isclose(t[-1], exact[2], rtol=1e-4)
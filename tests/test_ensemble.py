@@ -0,0 +1,80 @@
+import numpy as np
+import takahe
+
+def _ensemble():
+    cfgs = [{'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274},
+            {'m1': 1.40, 'm2': 1.20, 'a0': 4.00, 'e0': 0.100},
+            {'m1': 1.50, 'm2': 1.30, 'a0': 2.00, 'e0': 0.500}]
+
+    return takahe.load.from_list(cfgs)
+
+def test_columns_match_systems():
+    ensemble = _ensemble()
+
+    cts = ensemble.get_cts()
+    merge_count = sum(star.lifetime() <= 1 for star in ensemble)
+
+    for i, star in enumerate(ensemble):
+        assert np.isclose(star.get('coalescence_time'), cts[i])
+
+    assert np.isclose(ensemble[0].get('coalescence_time'), 2.734, atol=1e-1)
+    assert np.isclose(ensemble.average_coalescence_time(), np.mean(cts))
+    assert ensemble.merge_rate(1, return_as='abs') == merge_count
+
+def test_multiplicity():
+    cfg = {'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274}
+
+    weighted = takahe.ensemble.create()
+    weighted.add(takahe.load.from_data(dict(cfg)), multiplicity=4)
+
+    duplicated = takahe.ensemble.create()
+    for i in range(4):
+        duplicated.add(takahe.load.from_data(dict(cfg)))
+
+    assert len(weighted) == 1
+    assert weighted.size() == duplicated.size() == 4
+    assert np.isclose(weighted.get('mass'), duplicated.get('mass'))
+    assert weighted.merge_rate(3, 'abs') == duplicated.merge_rate(3, 'abs')
+
+def test_vectorised_merge_rate():
+    ensemble = _ensemble()
+    times = np.linspace(0, 10, 21)
+
+    counts = ensemble.merge_rate(times, return_as='abs')
+    assert all(counts[i] == ensemble.merge_rate(t, return_as='abs')
+               for i, t in enumerate(times))
+
+    ensemble.add(ensemble[0], multiplicity=2)
+    assert ensemble.merge_rate(10, return_as='abs') == counts[-1] + 2
+
+def test_delay_time_distribution():
+    ensemble = _ensemble()
+    edges = np.linspace(0, 20, 41)
+
+    counts, _ = ensemble.delay_time_distribution(edges, normalise=False)
+    assert np.allclose(counts, np.diff(ensemble.merge_rate(edges, 'abs')))
+    assert counts.sum() == ensemble.size()
+
+    dtd, _ = ensemble.delay_time_distribution(edges)
+    assert np.allclose(dtd, counts / 1e6 / 0.5)
+
+def test_snapshot():
+    ensemble = takahe.load.from_list([
+        {'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274,
+         'evolution_age': 1e8, 'rejuvenation_age': 0},
+        {'m1': 1.40, 'm2': 1.20, 'a0': 4.00, 'e0': 0.0}])
+
+    times = np.array([0.05, 0.1, 1.1])
+    a, e, f_orb, weights = ensemble.snapshot(times)
+
+    assert a.shape == e.shape == f_orb.shape == (3, 2)
+    assert np.isnan(a[0, 0]) and np.isclose(a[1, 0], 3.28)
+    assert np.isclose(e[1, 0], 0.274) and np.all(e[:, 1] == 0)
+    assert np.allclose(weights, 1)
+
+    # The first system has been inspiralling for 1 Gyr at the last time.
+    _, a_ref, e_ref = ensemble.evolve_all(t_grid=[1.0])
+    assert np.isclose(a[2, 0], a_ref[0, 0]) and np.isclose(e[2, 0], e_ref[0, 0])
+
+    # Kepler's third law, for a = 3.28 Solar radii and M = 2.68 Solar masses
+    assert np.isclose(1 / f_orb[1, 0] / (60 * 60 * 24), 0.42, rtol=1e-2)
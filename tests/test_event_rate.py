@@ -0,0 +1,212 @@
+import os
+
+import pytest
+import numpy as np
+import takahe
+from takahe.universe import _convolve_dtd
+
+def test_convolution_matches_bin_overlaps():
+    edges = np.linspace(0, 14, 201)
+    dtd = np.exp(-np.linspace(0, 5, 200))
+    SFRD = np.linspace(1, 2, 200)
+
+    # Perturbing the DTD edges by a negligible amount forces the
+    # general (overlap matrix) path rather than the convolution.
+    perturbed = edges * (1 + 1e-15)
+
+    fast = _convolve_dtd(dtd, edges, SFRD, edges)
+    slow = _convolve_dtd(dtd, perturbed, SFRD, edges)
+
+    assert np.allclose(fast, slow)
+    assert np.isclose(fast[-1], SFRD[-1] * dtd[0] * (edges[1] - edges[0]))
+
+def test_event_rate_by_metallicity():
+    low = takahe.load.from_list([{'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274},
+                                 {'m1': 1.40, 'm2': 1.20, 'a0': 4.00, 'e0': 0.100}])
+    high = takahe.load.from_list([{'m1': 1.50, 'm2': 1.30, 'a0': 2.00, 'e0': 0.500}])
+
+    uni = takahe.universe.create('real')
+    uni.populate_metallicities({'020': high, 'em4': low})
+
+    assert uni.get_metallicities() == ['em4', '020']
+
+    # Putting all of the star formation at one metallicity recovers
+    # the single-population event rate.
+    uni.populace = high
+    single, edges = uni.event_rate_distribution()
+
+    total, rates, _ = uni.event_rate_by_metallicity(
+        metallicity_cdf=lambda Z, z: (Z > 0.01) * np.ones_like(z))
+
+    assert np.allclose(rates['020'], single)
+    assert np.allclose(rates['em4'], 0)
+    assert np.allclose(total, single)
+
+    # The batched convolution matches separate convolutions on uneven
+    # bins too.
+    edges = np.geomspace(1e-3, uni.tH, 40)
+    total, rates, _ = uni.event_rate_by_metallicity(edges)
+
+    SFRD = uni._Universe__star_formation_by_metallicity(
+        edges, np.array([0, np.sqrt(1e-4 * 0.020), np.inf]),
+        takahe.universe._langer_norman)
+
+    assert np.allclose(SFRD.sum(axis=0),
+                       uni._Universe__star_formation_in_bins(edges))
+
+    for i, (z, pop) in enumerate([('em4', low), ('020', high)]):
+        dtd, _ = pop.delay_time_distribution(edges)
+        rate = _convolve_dtd(dtd, edges, SFRD[i], edges) / np.diff(edges)
+
+        assert np.allclose(rates[z], rate)
+
+    assert np.allclose(total, rates['em4'] + rates['020'])
+
+def test_event_rate_sweep():
+    uni = takahe.universe.create('real')
+    uni.populace = takahe.load.from_list([{'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274},
+                                          {'m1': 1.50, 'm2': 1.30, 'a0': 2.00, 'e0': 0.500}])
+
+    us = [4.6, 5.6, 6.6]
+    rates, edges = uni.event_rate_sweep(us, models=['eds', uni])
+
+    assert rates.shape == (6, len(edges) - 1)
+
+    single, _ = uni.event_rate_distribution()
+    assert np.allclose(rates[4], single)
+
+    eds = takahe.universe.create('eds')
+    dtd, _ = uni.populace.delay_time_distribution(edges)
+
+    for j, u in enumerate(us):
+        SFRD = eds._Universe__star_formation_in_bins(edges, u)
+        rate = _convolve_dtd(dtd, edges, SFRD, edges) / np.diff(edges)
+
+        assert np.allclose(rates[j], rate)
+
+def test_memoised_events_at():
+    uni = takahe.universe.create('real')
+    uni.populace = takahe.load.from_list([{'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274}])
+
+    rate, edges = uni.event_rate_distribution()
+    tL = np.array([0.5, 3.2, 10.1])
+    i = np.searchsorted(edges, tL, side='right') - 1
+
+    calls = []
+    compute = uni.event_rate_distribution
+
+    def counted():
+        calls.append(None)
+        return compute()
+
+    uni.event_rate_distribution = counted
+
+    assert np.allclose(uni.events_at(tL), rate[i])
+    assert uni.events_at(3.2) == rate[i[1]]
+    assert len(calls) == 1
+
+    # Adding to or replacing the populace, or rebinning, invalidates
+    # the memoised rate.
+    uni.populace.add(takahe.load.from_data({'m1': 1.5, 'm2': 1.3, 'a0': 2.0, 'e0': 0.5}))
+    uni.events_at(tL)
+    assert len(calls) == 2
+
+    uni.set_nbins(20)
+    uni.events_at(tL)
+    uni.events_at(tL)
+    assert len(calls) == 3
+
+    uni.populace = takahe.load.from_list([{'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274}])
+    uni.events_at(tL)
+    assert len(calls) == 4
+
+def test_memoised_event_rate(tmp_path, monkeypatch):
+    pytest.importorskip("kea")
+
+    monkeypatch.chdir(tmp_path)
+
+    uni = takahe.universe.create('real')
+    uni.populace = takahe.load.from_list([{'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274}])
+
+    events = uni.event_rate()
+    assert uni.event_rate() is events
+
+    rate, edges = uni.event_rate_distribution()
+    tL = np.array([0.5, 3.2, 10.1])
+    i = np.searchsorted(edges, tL, side='right') - 1
+
+    assert np.allclose(uni.events_at(tL), rate[i])
+    assert uni.events_at(3.2) == rate[i[1]]
+
+    # Adding to the populace or rebinning invalidates the result.
+    uni.populace.add(takahe.load.from_data({'m1': 1.5, 'm2': 1.3, 'a0': 2.0, 'e0': 0.5}))
+    assert uni.event_rate() is not events
+
+    events = uni.event_rate()
+    uni.set_nbins(20)
+    assert uni.event_rate() is not events
+    assert uni.event_rate().getNBins() == 20
+
+    # Nothing is written to the working directory unless asked for.
+    assert os.listdir(tmp_path) == []
+
+    uni.event_rate(pickle_results=True)
+    assert len(os.listdir(tmp_path / "output" / "pickles")) == 2
+
+def test_result_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(takahe.cache, "_settings", dict(takahe.cache._settings))
+    takahe.cache.configure(directory=str(tmp_path / "results"))
+
+    uni = takahe.universe.create('real')
+    uni.populace = takahe.load.from_list([{'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274}])
+
+    rate, _ = uni.event_rate_distribution()
+
+    # One DTD and one event rate, which are reused by a new universe
+    # holding the same systems.
+    assert len(os.listdir(tmp_path / "results")) == 2
+
+    again = takahe.universe.create('real')
+    again.populace = takahe.load.from_list([{'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274}])
+    assert np.array_equal(again.event_rate_distribution()[0], rate)
+    assert len(os.listdir(tmp_path / "results")) == 2
+
+    # A different cosmology reuses the DTD alone.
+    eds = takahe.universe.create('eds')
+    eds.populace = uni.populace
+    eds.event_rate_distribution(uni.get_bin_edges())
+    assert len(os.listdir(tmp_path / "results")) == 3
+
+    # The least recently used results are evicted first.
+    takahe.cache.clear()
+    a, b, c = (takahe.cache.key(name) for name in "abc")
+
+    takahe.cache.save(a, np.zeros(10))
+    takahe.cache.save(b, np.zeros(10))
+    os.utime(tmp_path / "results" / f"{a}.pickle", ns=(1, 1))
+    os.utime(tmp_path / "results" / f"{b}.pickle", ns=(2, 2))
+
+    size = os.path.getsize(tmp_path / "results" / f"{a}.pickle")
+    takahe.cache.configure(max_size=2*size)
+
+    assert takahe.cache.load(a) is not None
+    takahe.cache.save(c, np.zeros(10))
+
+    assert takahe.cache.load(b) is None
+    assert takahe.cache.load(a) is not None
+    assert takahe.cache.load(c) is not None
+
+    # Nothing at all is cached while the cache is disabled.
+    monkeypatch.setenv("TAKAHE_CACHE_DIR", str(tmp_path / "off"))
+    takahe.cache.configure(enabled=False, directory=str(tmp_path / "off"))
+
+    uni.set_nbins(20)
+    uni.event_rate_distribution()
+
+    fname = tmp_path / "table.dat"
+    fname.write_text("1.4 1.3 3.2 0.1\n")
+    takahe.load.read_table(str(fname))
+    takahe.load.cache_table(str(fname))
+    takahe.peters._table.__wrapped__()
+
+    assert not (tmp_path / "off").exists()
@@ -0,0 +1,160 @@
+import pytest
+import numpy as np
+import takahe
+from scipy.constants import G, c
+from takahe.constants import Solar_Radii
+
+def _system():
+    cfg = {'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274}
+    return takahe.load.from_data(data=cfg)
+
+def test_adaptive_matches_fixed():
+    BSS = _system()
+    t_end = 0.5 * BSS.get('coalescence_time') * 1e9 * 60 * 60 * 24 * 365.25
+
+    _, a_fixed, e_fixed = BSS.evolve_until((0, t_end))
+    t, a, e = BSS.evolve_until((0, t_end), method='adaptive')
+
+    assert len(t) < len(a_fixed)
+    assert np.isclose(a[-1], a_fixed[-1], rtol=1e-6)
+    assert np.isclose(e[-1], e_fixed[-1], rtol=1e-6)
+
+def test_dense_output():
+    BSS = _system()
+    t_end = 0.5 * BSS.get('coalescence_time') * 1e9 * 60 * 60 * 24 * 365.25
+    t_eval = np.linspace(0, t_end, 7)
+
+    t, a, e = BSS.evolve_until((0, t_end), method='adaptive', t_eval=t_eval)
+    _, a_steps, e_steps = BSS.evolve_until((0, t_end), method='adaptive')
+
+    assert np.allclose(t, t_eval / 31557600000000000)
+    assert np.isclose(a[0], 3.28) and np.isclose(a[-1], a_steps[-1])
+    assert np.all(np.diff(e) < 0)
+
+def test_evolve_all():
+    ensemble = takahe.load.from_list([
+        {'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274},
+        {'m1': 1.40, 'm2': 1.20, 'a0': 4.00, 'e0': 0.100}])
+
+    t_grid = np.array([0, 0.5, 1.0, 1000.0])
+    t, a, e = ensemble.evolve_all(t_grid=t_grid)
+
+    assert a.shape == e.shape == (2, 4)
+    assert np.allclose(a[:, 0], [3.28, 4.00])
+    assert np.all(np.isnan(a[:, -1]))
+
+    t_end = 1.0 * 1e9 * 60 * 60 * 24 * 365.25
+    _, a_single, e_single = ensemble[0].evolve_until((0, t_end),
+                                                      method='adaptive',
+                                                      t_eval=[t_end])
+
+    assert np.isclose(a[0, 2], a_single[-1])
+    assert np.isclose(e[0, 2], e_single[-1])
+
+def test_emulator_matches_integrator():
+    ensemble = takahe.load.from_list([
+        {'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274},
+        {'m1': 1.40, 'm2': 1.20, 'a0': 4.00, 'e0': 0.0},
+        {'m1': 1.40, 'm2': 1.20, 'a0': 4.00, 'e0': 0.9}])
+
+    t, a, e = ensemble.evolve_all(n_samples=50, method='adaptive',
+                                  rtol=1e-10, atol=1e-12)
+    t_emu, a_emu, e_emu = ensemble.evolve_all(n_samples=50,
+                                              method='emulator')
+
+    assert np.allclose(t, t_emu)
+    # The last sample is the (approximate) coalescence time.
+    assert np.allclose(a[:, :-2], a_emu[:, :-2], rtol=1e-6)
+    assert np.allclose(e[:, :-2], e_emu[:, :-2], rtol=1e-6, atol=1e-9)
+
+    star = ensemble[0]
+    _, a, e = star.evolve_until((0, 1e16), method='emulator',
+                                t_eval=[0, 5e15])
+    _, a_ref, e_ref = star.evolve_until((0, 1e16), method='adaptive',
+                                        t_eval=[0, 5e15])
+
+    assert np.allclose(a, a_ref[:2]) and np.allclose(e, e_ref[:2])
+
+def test_classify_circularisation():
+    ensemble = takahe.load.from_list([
+        {'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274},
+        {'m1': 1.33, 'm2': 1.35, 'a0': 50.0, 'e0': 0.01},
+        {'m1': 1.33, 'm2': 1.35, 'a0': 50.0, 'e0': 0.0},
+        {'m1': 1.33, 'm2': 1.35, 'a0': 1.00, 'e0': 0.0}])
+
+    thresholds = (1e-3, 2 * Solar_Radii)
+
+    analytic = ensemble.classify_circularisation(thresholds)
+    integrated = ensemble.classify_circularisation(thresholds,
+                                                   method='integrate')
+
+    assert list(analytic) == [False, True, True, False]
+    assert np.array_equal(analytic, integrated)
+    assert ensemble[1].circularises(thresholds) == True
+    assert ensemble[1].circularises(thresholds, method='adaptive') == True
+
+    # Strong tides circularise the first system before it merges.
+    tidal = ensemble.classify_circularisation(thresholds, method='integrate',
+                                              kernel='peters+tides',
+                                              kernel_params=[1e13])
+    assert list(tidal) == [True, True, True, False]
+
+def test_events():
+    star = takahe.BSS.create(1.40, 1.20, 4.00, 0.0)
+    tau = star.coalescence_time(mode='exact')
+
+    # Circular orbits shrink as a = a0 (1 - t/tau)^(1/4).
+    t, a, e, (t_event, a_event, e_event) = \
+        star.evolve_until_event(('separation', 2.0), rtol=1e-10)
+    assert np.isclose(a_event, 2.0) and np.isclose(t[-1], t_event)
+    assert np.isclose(t_event, tau * (1 - (2.0 / 4.00)**4), rtol=1e-6)
+
+    _, a, _, (t_fixed, a_fixed, _) = star.evolve_until((0, tau * 3.16e16),
+                                                       event=('separation', 2.0))
+    assert np.isclose(a_fixed, 2.0) and np.isclose(t_fixed, t_event)
+    assert np.all(a > 2.0)
+
+    ensemble = takahe.load.from_list([
+        {'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274},
+        {'m1': 1.40, 'm2': 1.20, 'a0': 4.00, 'e0': 0.0}])
+
+    # LISA band: the SMA at which the GW frequency is 1 mHz.
+    _, a, e, events = ensemble.evolve_all(n_samples=100,
+                                          event=('gw_frequency', 1e-3))
+    M = ensemble.column('m1') + ensemble.column('m2')
+    a_event = np.cbrt(G * M / (np.pi * 1e-3)**2) / (Solar_Radii * 1000)
+
+    assert np.allclose(events[:, 1], a_event)
+    assert np.all(events[:, 0] < ensemble.coalescence_times())
+    assert np.all(np.isnan(a[:, -1]))
+
+def test_kernels():
+    star = _system()
+    tau = 1e15 # seconds
+
+    # Tides alone conserve a (1 - e^2) while e decays exponentially.
+    _, a, e = star.evolve_until((0, tau), method='adaptive', kernel='tides',
+                                kernel_params=[tau], t_eval=[tau])
+    assert np.isclose(e[-1], 0.274 * np.exp(-1))
+    assert np.isclose(a[-1] * (1 - e[-1]**2), 3.28 * (1 - 0.274**2))
+
+    # Negligible tides leave the Peters evolution unchanged.
+    t_span = (0, 3e16)
+    _, a, e = star.evolve_until(t_span, method='adaptive', t_eval=[3e16])
+    _, a_tides, e_tides = star.evolve_until(t_span, method='adaptive',
+                                            kernel='peters+tides',
+                                            kernel_params=[1e40],
+                                            t_eval=[3e16])
+    assert np.isclose(a_tides[-1], a[-1]) and np.isclose(e_tides[-1], e[-1])
+
+    ensemble = takahe.load.from_list([
+        {'m1': 1.33, 'm2': 1.35, 'a0': 3.28, 'e0': 0.274},
+        {'m1': 1.40, 'm2': 1.20, 'a0': 4.00, 'e0': 0.1}])
+    _, a, e = ensemble.evolve_all(t_grid=[0.1], kernel='peters+tides',
+                                  kernel_params=[[1e15], [1e16]])
+    # Tides dominate the decay of e over 0.1 Gyr = 3.156e15 seconds.
+    assert np.allclose(e[:, 0], [0.274 * np.exp(-3.156), 0.1 * np.exp(-0.3156)],
+                       rtol=0.05)
+
+    with pytest.raises(TypeError):
+        takahe.kernels.get_kernel(lambda t, y, beta, params: y)
@@ -0,0 +1,152 @@
+import os
+
+import pytest
+import numpy as np
+import takahe
+from takahe.constants import Solar_Mass
+
+def test_binary_table_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("TAKAHE_CACHE_DIR", str(tmp_path / "cache"))
+
+    fname = tmp_path / "table.dat"
+    fname.write_text("1.4 1.3  3.2 0.1\n1.2   1.1 4.0 0.0\n")
+    names = ['m1', 'm2', 'a0', 'e0']
+
+    parsed = takahe.load.read_table(str(fname), names, cache=False)
+
+    # Reading only the first rows parses just those, without a copy.
+    assert takahe.load.read_table(str(fname), names, nrows=1).equals(parsed[:1])
+    assert not (tmp_path / "cache").exists()
+
+    first = takahe.load.read_table(str(fname), names)
+
+    assert len(os.listdir(tmp_path / "cache" / "tables")) == 1
+    assert first.equals(parsed)
+    assert takahe.load.read_table(str(fname), names, nrows=1).equals(parsed[:1])
+
+    # Changing the file invalidates its binary copy.
+    fname.write_text("1.4 1.3 3.2 0.1\n")
+    os.utime(fname, ns=(0, 0))
+
+    assert len(takahe.load.read_table(str(fname), names)) == 1
+    assert len(os.listdir(tmp_path / "cache" / "tables")) == 2
+
+    # Over the size limit, the least recently used copies are evicted.
+    monkeypatch.setattr(takahe.cache, "_settings", dict(takahe.cache._settings))
+    takahe.cache.configure(max_table_size=0)
+
+    takahe.load.cache_table(str(fname), ['m1', 'm2', 'a0', 'e0_'])
+    assert os.listdir(tmp_path / "cache" / "tables") == []
+
+def test_chunked_statistics(tmp_path, monkeypatch):
+    monkeypatch.setenv("TAKAHE_CACHE_DIR", str(tmp_path / "cache"))
+
+    rng = np.random.default_rng(7)
+    rows = np.column_stack([rng.uniform(1, 2, 50),
+                            rng.uniform(1, 2, 50),
+                            rng.uniform(1, 10, 50),
+                            rng.uniform(0, 0.9, 50),
+                            rng.uniform(0, 1e-3, 50),
+                            10**rng.uniform(6, 9, 50),
+                            np.zeros(50)])
+    fname = str(tmp_path / "table.dat")
+    np.savetxt(fname, rows)
+
+    names = ['m1', 'm2', 'a0', 'e0', 'weight', 'evolution_age',
+             'rejuvenation_age']
+    ensemble = takahe.load.from_file(fname, name_hints=names, n_stars='all')
+
+    for chunks in [takahe.load.iter_chunks(fname, names, chunk_size=7),
+                   takahe.load.iter_chunks(fname, names, chunk_size=50)]:
+        stats = takahe.ensemble.accumulate(chunks)
+
+        assert len(stats) == len(ensemble) and stats.size() == ensemble.size()
+        assert np.allclose(stats.merge_rate(),
+                           ensemble.merge_rate(stats.edges))
+        assert np.allclose(stats.delay_time_distribution()[0],
+                           ensemble.delay_time_distribution()[0])
+        assert np.isclose(stats.average_coalescence_time(),
+                          ensemble.average_coalescence_time())
+
+        # Create the binary copy, which the second pass memory-maps.
+        takahe.load.read_table(fname, names)
+
+def test_mass_budget(tmp_path, monkeypatch):
+    monkeypatch.setenv("TAKAHE_CACHE_DIR", str(tmp_path / "cache"))
+
+    fname = str(tmp_path / "table.dat")
+    np.savetxt(fname, np.tile([1.0, 1.0, 5.0, 0.1, 0.01], (10, 1)))
+    names = ['m1', 'm2', 'a0', 'e0', 'weight']
+
+    # Each row stands for ceil(0.01 * 10) = 1 system of 2 Solar masses.
+    for n_stars in [100, 'all']:
+        ensemble = takahe.load.from_file_efficient(fname, name_hints=names,
+                                                   n_stars=n_stars, mass=10)
+        assert len(ensemble) == ensemble.size() == 5
+
+    ensemble = takahe.load.from_file_efficient(fname, name_hints=names,
+                                               n_stars=3, mass=1000)
+    assert len(ensemble) == 3 and ensemble.size() == 30
+
+def test_seeded_sampling(tmp_path, monkeypatch):
+    monkeypatch.setenv("TAKAHE_CACHE_DIR", str(tmp_path / "cache"))
+
+    fname = str(tmp_path / "table.dat")
+    rows = np.column_stack([np.linspace(1, 2, 100), np.ones(100),
+                            np.full(100, 5.0), np.zeros(100),
+                            np.append(np.zeros(90), np.ones(10))])
+    np.savetxt(fname, rows)
+    names = ['m1', 'm2', 'a0', 'e0', 'weight']
+
+    def draw(seed, **kwargs):
+        ensemble = takahe.load.random_from_file(fname, 100, names, n_stars=10,
+                                                seed=seed, chunk_size=7,
+                                                **kwargs)
+        return ensemble.column('m1')
+
+    assert np.array_equal(draw(1), draw(1))
+    assert not np.array_equal(draw(1), draw(2))
+    assert len(np.unique(draw(1))) == 10
+
+    # Only the last ten rows have any weight.
+    assert np.allclose(np.sort(draw(3, weighted=True)),
+                       rows[90:, 0] * Solar_Mass)
+
+def test_from_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("TAKAHE_CACHE_DIR", str(tmp_path / "cache"))
+
+    rng = np.random.default_rng(3)
+
+    for z in ['z020', 'zem4']:
+        rows = np.column_stack([rng.uniform(1, 2, (20, 2)),
+                                rng.uniform(1, 10, 20),
+                                rng.uniform(0, 0.9, 20),
+                                rng.uniform(0, 1e-3, 20),
+                                np.zeros((20, 2))])
+        np.savetxt(tmp_path / f"Remnant-Birth-bin-imf135_300-{z}_StandardJJ.dat",
+                   rows)
+
+    (tmp_path / "README").write_text("not a BPASS file")
+
+    serial = takahe.load.from_directory(str(tmp_path), workers=1)
+    parallel = takahe.load.from_directory(str(tmp_path), workers=2)
+
+    assert sorted(parallel.keys()) == ['020', 'em4']
+
+    for z in serial:
+        for key in ['m1', 'a0', 'coalescence_time', 'multiplicity']:
+            assert np.array_equal(serial[z].column(key),
+                                  parallel[z].column(key))
+
+    # A file which fails to load frees the blocks of those which did.
+    rows[:, 3] = 1.5
+    np.savetxt(tmp_path / "Remnant-Birth-bin-imf135_300-z001_StandardJJ.dat",
+               rows)
+
+    shm = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+    with pytest.raises(ValueError):
+        takahe.load.from_directory(str(tmp_path), workers=2)
+
+    if os.path.isdir("/dev/shm"):
+        assert set(os.listdir("/dev/shm")) <= shm
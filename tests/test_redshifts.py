@@ -8,3 +8,46 @@ def test_redshift():
         d_c = uni.compute_comoving_distance(z)
 
         assert np.isclose(d, d_c)
+
+def test_lookback_table():
+    uni = takahe.universe.create('eds')
+    z = np.array([0.1, 1, 10])
+
+    # Analytic lookback time for an Einstein-de Sitter universe.
+    expected = 2/3 * uni.tH * (1 - (1+z)**-1.5)
+
+    tL = uni._Universe__redshift_to_lookback(z)
+
+    assert np.allclose(tL, expected, rtol=1e-12, atol=uni.lookback_error())
+    assert np.allclose(uni._Universe__lookback_to_redshift(tL), z)
+
+def test_array_distances():
+    uni = takahe.universe.create('eds')
+    z = np.linspace(0, 10, 101)
+
+    # Analytic comoving distance for an Einstein-de Sitter universe.
+    expected = 2 * uni.DH * (1 - 1/np.sqrt(1+z))
+
+    d_c = uni.compute_comoving_distance(z)
+
+    assert np.allclose(d_c, expected, rtol=1e-12,
+                       atol=uni.comoving_distance_error())
+    assert np.allclose(uni.compute_redshift(d_c), z)
+    assert np.allclose(uni.comoving_volume(z=z), 4*np.pi/3 * d_c**3)
+
+def test_closed_forms_match_table():
+    z = np.linspace(0, 20, 41)
+
+    for model in ['lowdensity', 'highlambda', 'real']:
+        exact = takahe.universe.create(model)
+
+        # Perturbing the density parameters slightly takes the
+        # universe off the closed-form paths.
+        tabulated = takahe.universe.create('custom',
+                                           hubble_parameter=exact.H0,
+                                           omega_m=exact.omega_m + 1e-9,
+                                           omega_lambda=exact.omega_lambda + 1e-9)
+
+        assert np.allclose(exact.compute_comoving_distance(z),
+                           tabulated.compute_comoving_distance(z),
+                           rtol=1e-7, atol=tabulated.comoving_distance_error())